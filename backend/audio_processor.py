@@ -4,13 +4,35 @@ import logging
 import re
 import threading
 import queue
-from typing import Callable, Optional
+from functools import lru_cache
+from typing import Callable, Optional, Set, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("audio_processor")
 
+# whisper-cli reports the language it picked with -l auto on stderr
+LANGUAGE_PATTERN = re.compile(r"auto-detected language:\s*([a-z]{2,3})\b")
+
+# Running whisper processes, so a shutdown past its drain deadline can stop them
+_processes: Set[subprocess.Popen] = set()
+_processes_lock = threading.Lock()
+_stopping = False
+
+class TranscriptionInterrupted(RuntimeError):
+    """Raised when whisper was stopped by terminate_transcriptions before it finished"""
+
+def terminate_transcriptions() -> int:
+    """Stop the running whisper processes and refuse new ones; returns how many were stopped"""
+    global _stopping
+    with _processes_lock:
+        _stopping = True
+        processes = list(_processes)
+    for process in processes:
+        process.terminate()
+    return len(processes)
+
 def _reader_thread(pipe: subprocess.PIPE, progress_queue: queue.Queue):
     try:
         with pipe:
@@ -19,6 +41,49 @@ def _reader_thread(pipe: subprocess.PIPE, progress_queue: queue.Queue):
     finally:
         progress_queue.put(None)
 
+@lru_cache(maxsize=1)
+def resolve_whisper_paths() -> Tuple[str, str]:
+    """
+    Resolve and validate the whisper-cli binary and model paths once per process.
+    
+    Returns:
+        tuple: (binary_path, model_path)
+    """
+    binary_path = os.path.abspath(os.getenv("STUDYFLOW_WHISPER_BIN") or os.path.join(
+        os.path.dirname(__file__), "whisper.cpp", "build", "bin", "whisper-cli"))
+    model_path = os.path.abspath(os.getenv("STUDYFLOW_WHISPER_MODEL") or os.path.join(
+        os.path.dirname(__file__), "models", "large-v3-turbo.bin"))
+
+    for path, desc in [(binary_path, "Binary"), (model_path, "Model")]:
+        if not os.path.exists(path):
+            error = f"{desc} not found at: {path}"
+            logger.error(error)
+            raise FileNotFoundError(error)
+    return binary_path, model_path
+
+@lru_cache(maxsize=1)
+def resolve_draft_model() -> Optional[str]:
+    """
+    Path of the small model used for fast drafts, or None when it is not installed.
+    """
+    model_path = os.path.abspath(os.getenv("STUDYFLOW_DRAFT_MODEL") or os.path.join(
+        os.path.dirname(__file__), "models", "base.bin"))
+    if not os.path.exists(model_path):
+        logger.info(f"Draft model not found at: {model_path}, drafts are disabled")
+        return None
+    return model_path
+
+def warm_up_whisper() -> None:
+    """Load the whisper-cli binary and hint the model file into the page cache"""
+    binary_path, model_path = resolve_whisper_paths()
+    subprocess.run([binary_path, "--help"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if hasattr(os, "posix_fadvise"):
+        fd = os.open(model_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
 def get_audio_duration(file_path: str) -> float:
     """Get the duration of an audio file in seconds using ffprobe"""
     try:
@@ -35,33 +100,40 @@ def get_audio_duration(file_path: str) -> float:
         logger.error(f"Failed to get audio duration: {e}")
         return 0.0
 
-def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> str:
+def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int], None]] = None,
+                     audio_duration: Optional[float] = None,
+                     language_callback: Optional[Callable[[str], None]] = None,
+                     line_callback: Optional[Callable[[str], None]] = None,
+                     model_path: Optional[str] = None,
+                     language: Optional[str] = None) -> str:
     """
     Transcribes an audio file using the Whisper.cpp binary.
     
     Parameters:
         file_path (str): Path to the audio file.
         progress_callback (callable): Optional callback function that receives progress updates (0-100).
+        audio_duration (float): Duration of the audio if already known, to skip probing it again.
+        language_callback (callable): Optional callback receiving the language code whisper detected.
+        line_callback (callable): Optional callback receiving each transcript line as whisper prints it.
+            Lines handed to it are not accumulated.
+        model_path (str): Optional model to use instead of the configured one (e.g. the draft model).
+        language (str): Language code to transcribe in, skipping auto-detection when already known.
     
     Returns:
-        str: The transcription text.
+        str: The transcription text, or an empty string when line_callback consumed the lines.
     """
-    # Get absolute paths
-    binary_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 
-                                              "whisper.cpp", "build", "bin", "whisper-cli"))
-    model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 
-                                            "models", "large-v3-turbo.bin"))
+    # Binary and model are resolved once per process; only the audio is checked per call
+    binary_path, default_model_path = resolve_whisper_paths()
+    model_path = model_path or default_model_path
     abs_file_path = os.path.abspath(file_path)
-
-    # Check if files exist
-    for path, desc in [(binary_path, "Binary"), (model_path, "Model"), (abs_file_path, "Audio file")]:
-        if not os.path.exists(path):
-            error = f"{desc} not found at: {path}"
-            logger.error(error)
-            raise FileNotFoundError(error)
+    if not os.path.exists(abs_file_path):
+        error = f"Audio file not found at: {abs_file_path}"
+        logger.error(error)
+        raise FileNotFoundError(error)
 
     # Get audio duration for progress estimation
-    audio_duration = get_audio_duration(file_path)
+    if audio_duration is None:
+        audio_duration = get_audio_duration(file_path)
     if audio_duration <= 0:
         logger.warning("Could not determine audio duration, progress updates may be inaccurate")
 
@@ -75,6 +147,7 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
         logger.info("Sent initial progress: 0%")
 
     # Start the transcription process
+    process = None
     try:
         logger.info(f"Starting transcription of {abs_file_path} (duration: {audio_duration:.2f}s)")
         cmd = [
@@ -82,20 +155,24 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
             "-m", model_path,
             "-f", abs_file_path,
             "-otxt",      # Output in plain text format
-            "-l", "auto", # Auto language detection
+            "-l", language or "auto", # Auto language detection unless already known
             "--print-progress"
         ]
         
         logger.debug(f"Running command: {' '.join(cmd)}")
         
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            bufsize=1,
-            text=True
-        )
+        with _processes_lock:
+            if _stopping:
+                raise TranscriptionInterrupted("Transcription not started, the server is shutting down")
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                bufsize=1,
+                text=True
+            )
+            _processes.add(process)
 
         # Start reader threads for stdout and stderr
         stdout_thread = threading.Thread(target=_reader_thread, args=(process.stdout, output_queue))
@@ -107,6 +184,17 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
 
         # Monitor progress and transcription output
         transcription = []
+        output_lines = 0
+        stdout_done = False
+
+        def handle_output(line: str) -> None:
+            nonlocal output_lines
+            output_lines += bool(line.strip())
+            if line_callback:
+                line_callback(line)
+            else:
+                transcription.append(line)
+
         last_progress = 0
         # Progress pattern matching both the segment progress and overall progress
         segment_pattern = re.compile(r"\[(\d+)%\]")  # Matches [XX%]
@@ -131,6 +219,13 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
                 # Log the raw progress line for debugging
                 logger.debug(f"Progress line: {progress_line.strip()}")
                 
+                # Capture the language whisper detected so nobody has to detect it again
+                if language_callback and "auto-detected language" in progress_line:
+                    language_match = LANGUAGE_PATTERN.search(progress_line)
+                    if language_match:
+                        logger.info(f"Whisper detected language: {language_match.group(1)}")
+                        language_callback(language_match.group(1))
+
                 # Check for error messages
                 if "error" in progress_line.lower():
                     error_occurred = True
@@ -195,14 +290,24 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
                 if not (stdout_thread.is_alive() or stderr_thread.is_alive()):
                     done_reading = True
 
-            # Check for transcription output
-            try:
-                output_line = output_queue.get_nowait()
-                if output_line is None:
+            # Hand over every transcription line that has arrived
+            while not stdout_done:
+                try:
+                    output_line = output_queue.get_nowait()
+                except queue.Empty:
                     break
-                transcription.append(output_line)
-            except queue.Empty:
-                pass
+                if output_line is None:
+                    stdout_done = True
+                else:
+                    handle_output(output_line)
+
+        # Collect output still buffered once stderr has closed
+        while not stdout_done:
+            output_line = output_queue.get()
+            if output_line is None:
+                stdout_done = True
+            else:
+                handle_output(output_line)
 
         # Send 100% progress if we haven't already
         if progress_callback and last_progress < 100:
@@ -211,14 +316,16 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
 
         # Wait for process to complete and get return code
         return_code = process.wait()
+        with _processes_lock:
+            if _stopping and return_code != 0:
+                raise TranscriptionInterrupted("Transcription stopped by the server shutdown")
         
         # Check process result and output
         if return_code == 0:
             # Success case - process completed normally
-            result = "".join(transcription).strip()
-            if result:
+            if output_lines:
                 logger.info("Transcription completed successfully")
-                return result
+                return "".join(transcription).strip()
             else:
                 error = "Transcription completed but no output was generated"
                 logger.error(error)
@@ -234,3 +341,6 @@ def transcribe_audio(file_path: str, progress_callback: Optional[Callable[[int],
     except Exception as e:
         logger.error(f"Error during transcription: {str(e)}")
         raise
+    finally:
+        with _processes_lock:
+            _processes.discard(process)
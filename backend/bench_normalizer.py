@@ -0,0 +1,120 @@
+"""
+Benchmark of transcript post-processing on multi-hour synthetic whisper output.
+
+Compares three ways of getting timestamped text, plain text and segments:
+- legacy: the previous code as it was (join every stdout line, line-by-line
+  clean-up with uncompiled patterns, another regex over the whole string).
+  Its patterns did not match whisper's output, so it is a lower bound that
+  does not actually produce plain text or segments.
+- legacy_equivalent: the same approach with patterns fixed so that it
+  produces the same outputs as the normalizer.
+- single_pass: TranscriptNormalizer fed line by line. In the server, feeding
+  happens while whisper is still decoding, so only the "finalize" column
+  (joining the texts and segments) is left once transcription ends.
+
+Usage (from the backend directory):
+    python bench_normalizer.py [hours ...]
+"""
+import re
+import sys
+import time
+import random
+import tracemalloc
+
+from transcript_normalizer import TranscriptNormalizer, format_timestamp
+
+WORDS = ("alors la thermodynamique énergie système entropie donc on voit que "
+         "the lecture continues with an example of heat transfer between bodies").split()
+
+
+def synthetic_lines(hours: float, seed: int = 0):
+    """Whisper-style stdout lines covering `hours` of audio"""
+    rng = random.Random(seed)
+    t = 0.0
+    lines = []
+    while t < hours * 3600:
+        length = rng.uniform(2.0, 7.0)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18)))
+        if rng.random() < 0.02:
+            text = "*music*"
+        lines.append(f"[{format_timestamp(t)} --> {format_timestamp(t + length)}]   {text}\n")
+        t += length
+    return lines
+
+
+def legacy(lines):
+    transcription = "".join(lines).strip()
+    cleaned_lines = []
+    for line in transcription.split('\n'):
+        if not line.strip() or re.match(r'^\[\d{2}:\d{2}:\d{2}\.\d{3} -->', line):
+            continue
+        line = re.sub(r'\[\d{2}:\d{2}:\d{2}\.\d{3} -->\s*\d{2}:\d{2}:\d{2}\.\d{3}\]\s*', '', line)
+        line = re.sub(r'\*.*?\*', '', line)
+        if line.strip():
+            cleaned_lines.append(line.strip())
+    plain_text = re.sub(r'\[\d{2}:\d{2}:\d{2}\] ', '', transcription)
+    return transcription, plain_text, '\n'.join(cleaned_lines)
+
+
+def legacy_equivalent(lines):
+    transcription = "".join(lines).strip()
+    segments = []
+    cleaned_lines = []
+    for line in transcription.split('\n'):
+        match = re.match(r'^\[(\d{2}):(\d{2}):(\d{2})\.(\d{3}) --> (\d{2}):(\d{2}):(\d{2})\.(\d{3})\]', line)
+        line = re.sub(r'\[\d{2}:\d{2}:\d{2}\.\d{3} -->\s*\d{2}:\d{2}:\d{2}\.\d{3}\]\s*', '', line)
+        line = re.sub(r'\*.*?\*', '', line)
+        if line.strip() and match:
+            values = [int(v) for v in match.groups()]
+            segments.append({
+                "start": values[0] * 3600 + values[1] * 60 + values[2] + values[3] / 1000,
+                "end": values[4] * 3600 + values[5] * 60 + values[6] + values[7] / 1000,
+                "text": line.strip(),
+            })
+            cleaned_lines.append(line.strip())
+    plain_text = re.sub(r'\[\d{2}:\d{2}:\d{2}\.\d{3} -->\s*\d{2}:\d{2}:\d{2}\.\d{3}\]\s*', '', transcription)
+    return transcription, plain_text, '\n'.join(cleaned_lines), segments
+
+
+def single_pass(lines):
+    normalizer = TranscriptNormalizer()
+    for line in lines:
+        normalizer.feed(line)
+    return normalizer.timestamped_text, normalizer.plain_text, normalizer.segment_dicts()
+
+
+def measure(func, lines, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(lines)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(lines)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def finalize_only(lines):
+    """Time spent after the last line, when feeding overlapped with decoding"""
+    normalizer = TranscriptNormalizer()
+    for line in lines:
+        normalizer.feed(line)
+    started = time.perf_counter()
+    normalizer.timestamped_text, normalizer.plain_text, normalizer.segment_dicts()
+    return time.perf_counter() - started
+
+
+def main(hours_list):
+    print(f"{'hours':>6} {'lines':>7} | {'legacy':>14} | {'legacy equiv.':>14} | {'single pass':>14} | {'finalize':>8}")
+    print(f"{'':>6} {'':>7} | {'ms':>6} {'peak MB':>7} | {'ms':>6} {'peak MB':>7} | {'ms':>6} {'peak MB':>7} | {'ms':>8}")
+    for hours in hours_list:
+        lines = synthetic_lines(hours)
+        row = [measure(func, lines) for func in (legacy, legacy_equivalent, single_pass)]
+        cells = " | ".join(f"{t * 1000:>6.1f} {peak / 1e6:>7.1f}" for t, peak in row)
+        print(f"{hours:>6} {len(lines):>7} | {cells} | {finalize_only(lines) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([float(h) for h in sys.argv[1:]] or [1, 3, 10])
@@ -0,0 +1,47 @@
+"""
+Startup benchmark: time a cold `import main` and the time until the app is
+ready to serve, each in a fresh interpreter.
+
+Usage (from the backend directory):
+    python bench_startup.py [runs]
+"""
+import sys
+import json
+import statistics
+import subprocess
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+modules = sorted(m for m in ("openai", "langdetect", "numpy") if m in __import__("sys").modules)
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    ready = time.perf_counter()
+    health = client.get("/health").json()
+print(json.dumps({
+    "import": imported - started,
+    "ready": ready - started,
+    "eager_modules": modules,
+    "stages": health.get("stages") or health.get("detail", {}).get("stages"),
+}))
+"""
+
+def run_once() -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(runs: int) -> None:
+    samples = [run_once() for _ in range(runs)]
+    for key in ("import", "ready"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:>7}: median {statistics.median(values) * 1000:7.1f} ms, "
+              f"max {max(values) * 1000:7.1f} ms over {runs} runs")
+    print(f"modules imported eagerly by main: {samples[-1]['eager_modules'] or 'none'}")
+    print(f"startup stages (s): {samples[-1]['stages']}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,107 @@
+"""
+Summary throughput benchmark against a local fake OpenAI-compatible endpoint
+that only accepts a fixed number of concurrent completions, answers 429
+(with retry-after-ms) above that, and adds latency to every completion.
+
+Compares a burst of bare completions (the previous behaviour) with the same
+burst through the adaptive limiter used by the summarizer.
+
+Usage (from the backend directory):
+    python bench_summaries.py [requests] [capacity] [latency_seconds]
+"""
+import os
+import sys
+import time
+import socket
+import asyncio
+import logging
+import threading
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+
+def fake_provider(capacity: int, latency: float) -> FastAPI:
+    app = FastAPI()
+    state = {"in_flight": 0, "rejected": 0}
+
+    @app.post("/v1/chat/completions")
+    async def completions():
+        if state["in_flight"] >= capacity:
+            state["rejected"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429, headers={"retry-after-ms": "50"}
+            )
+        state["in_flight"] += 1
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            state["in_flight"] -= 1
+        return {
+            "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": "fake",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "- point"}}],
+        }
+
+    app.state.counters = state
+    return app
+
+
+def serve(app: FastAPI) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+async def bare_burst(requests: int, key: str) -> int:
+    """Previous behaviour: everything at once, no retries; returns the successes"""
+    import openai
+    client = openai.AsyncOpenAI(api_key=key, max_retries=0)
+
+    async def one():
+        await client.chat.completions.create(model="fake", messages=[{"role": "user", "content": "x"}])
+
+    results = await asyncio.gather(*(one() for _ in range(requests)), return_exceptions=True)
+    return sum(not isinstance(result, Exception) for result in results)
+
+
+async def limited_burst(requests: int, key: str) -> int:
+    from summarizer import generate_bullet_summary
+    results = await asyncio.gather(
+        *(generate_bullet_summary("Some transcript text.", key, "en") for _ in range(requests)),
+        return_exceptions=True
+    )
+    return sum(not isinstance(result, Exception) for result in results)
+
+
+def main(requests: int, capacity: int, latency: float) -> None:
+    logging.getLogger("rate_limiter").setLevel(logging.ERROR)
+    app = fake_provider(capacity, latency)
+    os.environ["OPENAI_BASE_URL"] = serve(app)
+    print(f"{requests} completions, provider capacity {capacity} concurrent, {latency:.2f}s latency")
+    print(f"ideal time: {requests / capacity * latency:.2f}s")
+
+    for name, burst, key in (("bare", bare_burst, "bench-bare"), ("limited", limited_burst, "bench-limited")):
+        app.state.counters["rejected"] = 0
+        started = time.perf_counter()
+        succeeded = asyncio.run(burst(requests, key))
+        elapsed = time.perf_counter() - started
+        print(f"{name:>8}: {succeeded}/{requests} succeeded in {elapsed:.2f}s "
+              f"({succeeded / elapsed:.1f}/s), {app.state.counters['rejected']} rejected")
+
+    from rate_limiter import limiter_metrics
+    print(f"limiter: {list(limiter_metrics().values())[0]}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 200,
+         int(args[1]) if len(args) > 1 else 8,
+         float(args[2]) if len(args) > 2 else 0.2)
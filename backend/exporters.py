@@ -0,0 +1,168 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from transcript_normalizer import Segment, format_timestamp, normalize_transcript
+
+logger = logging.getLogger("exporters")
+
+# Rendered exports kept in memory, bounded by total size
+EXPORT_CACHE_BYTES = int(os.getenv("STUDYFLOW_EXPORT_CACHE_MB", "64")) * 1024 * 1024
+
+
+def result_segments(result: Dict) -> List[Segment]:
+    """Segments of a stored result; older results only have the timestamped text"""
+    if result.get("segments") is not None:
+        return [Segment.from_dict(segment) for segment in result["segments"]]
+    return normalize_transcript(result.get("transcription", "")).segments
+
+
+def render_srt(result: Dict) -> str:
+    blocks = []
+    for index, segment in enumerate(result_segments(result), start=1):
+        start = format_timestamp(segment.start).replace(".", ",")
+        end = format_timestamp(segment.end).replace(".", ",")
+        blocks.append(f"{index}\n{start} --> {end}\n{segment.text}\n")
+    return "\n".join(blocks)
+
+
+def render_vtt(result: Dict) -> str:
+    blocks = ["WEBVTT\n"]
+    for segment in result_segments(result):
+        blocks.append(f"{format_timestamp(segment.start)} --> {format_timestamp(segment.end)}\n{segment.text}\n")
+    return "\n".join(blocks)
+
+
+def render_json(result: Dict) -> str:
+    document = {
+        "jobId": result.get("jobId"),
+        "language": result.get("language"),
+        "segments": [segment.to_dict() for segment in result_segments(result)],
+    }
+    if "petitResume" in result:
+        document["keyPoints"] = result["petitResume"]
+    if "grosResume" in result:
+        document["detailedSummary"] = result["grosResume"]
+    return json.dumps(document, ensure_ascii=False)
+
+
+def render_markdown(result: Dict) -> str:
+    parts = ["# Transcription\n", "### Transcription:\n"]
+    parts.extend(f"{segment.timestamped()}\n" for segment in result_segments(result))
+    if "petitResume" in result:
+        parts.append(f"\n### Key Points:\n{result['petitResume']}\n")
+    if "grosResume" in result:
+        parts.append(f"\n### Detailed Summary:\n{result['grosResume']}\n")
+    return "".join(parts)
+
+
+# format -> (renderer, media type, file extension)
+FORMATS: Dict[str, Tuple[Callable[[Dict], str], str, str]] = {
+    "srt": (render_srt, "application/x-subrip", "srt"),
+    "vtt": (render_vtt, "text/vtt", "vtt"),
+    "json": (render_json, "application/json", "json"),
+    "md": (render_markdown, "text/markdown", "md"),
+}
+
+
+class RenderedExport:
+    """A rendered export, with its gzip encoding computed once"""
+    def __init__(self, body: bytes, etag: str, media_type: str, extension: str):
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        self.etag = etag
+        self.media_type = media_type
+        self.extension = extension
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped)
+
+
+def export_etag(result_path: str, export_format: str) -> str:
+    """Strong ETag derived from the stored result's identity, without reading it"""
+    stat = os.stat(result_path)
+    key = f"{result_path}:{stat.st_mtime_ns}:{stat.st_size}:{export_format}"
+    return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+
+def encoded_etag(etag: str, gzipped: bool) -> str:
+    """Each content encoding is its own representation and gets its own strong ETag"""
+    return etag[:-1] + '-gz"' if gzipped else etag
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip, honoring q-values (gzip;q=0 refuses it)"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in weights:
+            return weights[coding] > 0
+    return False
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists this ETag (weak comparison, as RFC 9110 requires)"""
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class RenderCache:
+    """LRU cache of rendered exports bounded by total bytes"""
+    def __init__(self, max_bytes: int = EXPORT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[str, RenderedExport]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag: str) -> Optional[RenderedExport]:
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+            return entry
+
+    def put(self, entry: RenderedExport) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(entry.etag, None)
+            if previous is not None:
+                self.bytes -= previous.size
+            self._entries[entry.etag] = entry
+            self.bytes += entry.size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.size
+
+    def render(self, result_path: str, export_format: str) -> RenderedExport:
+        """Return the cached export for a stored result, rendering it on a miss"""
+        renderer, media_type, extension = FORMATS[export_format]
+        etag = export_etag(result_path, export_format)
+        entry = self.get(etag)
+        if entry is None:
+            with open(result_path, encoding="utf-8") as f:
+                result = json.load(f)
+            entry = RenderedExport(renderer(result).encode("utf-8"), etag, media_type, extension)
+            self.put(entry)
+            logger.info(f"Rendered {export_format} export of {os.path.basename(result_path)} "
+                        f"({len(entry.body)} bytes)")
+        return entry
@@ -1,31 +1,31 @@
 import os
-import re
 import json
 import uuid
-import shutil
 import datetime
 import logging
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, Optional
+
+from spool import SpoolManager
+from transcript_normalizer import normalize_transcript
 
 logger = logging.getLogger("file_handler")
 
 class FileHandler:
-    def __init__(self, base_dir: str):
+    def __init__(self, base_dir: str, spool: Optional[SpoolManager] = None):
         self.base_dir = base_dir
-        self.temp_files: List[str] = []
+        # Temp files used to be written next to the sources; the janitor still sweeps there
+        self.spool = spool or SpoolManager(legacy_dirs=[base_dir])
         self.results_folder = os.path.join(base_dir, "results")
         os.makedirs(self.results_folder, exist_ok=True)
 
-    def save_temp_audio(self, file_content) -> str:
-        """Save uploaded file temporarily and return its path"""
-        audio_path = os.path.join(self.base_dir, f"temp_{uuid.uuid4()}.wav")
-        self.temp_files.append(audio_path)
-        
-        with open(audio_path, "wb") as buffer:
-            shutil.copyfileobj(file_content, buffer)
-        
-        return audio_path
+    def save_temp_audio(self, file_content, job_id: Optional[str] = None, size: Optional[int] = None) -> str:
+        """Spool an uploaded file for a job and return its path"""
+        return self.spool.spool(job_id or str(uuid.uuid4()), file_content, size)
+
+    def release_temp_audio(self, job_id: str) -> None:
+        """Delete a job's temporary files and free its spool space"""
+        self.spool.release(job_id)
 
     def save_results(self, transcript: str, summaries: Dict = None) -> Dict[str, str]:
         """Save transcription and summaries to files"""
@@ -38,65 +38,20 @@ class FileHandler:
         if summaries:
             final_result.update(summaries)
 
-        # Create markdown content
-        markdown_content = f"""# Transcription {timestamp}
-### Transcription:
-{transcript}
-"""
-        if "petitResume" in final_result:
-            markdown_content += f"""
-### Key Points:
-{final_result['petitResume']}
-"""
-        if "grosResume" in final_result:
-            markdown_content += f"""
-### Detailed Summary:
-{final_result['grosResume']}
-"""
-
-        # Save JSON result
+        # Save JSON result; other formats are rendered on demand (see exporters.py)
         json_path = os.path.join(self.results_folder, f"result_{timestamp}.json")
         with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(final_result, f, ensure_ascii=False, indent=4)
+            json.dump(final_result, f, ensure_ascii=False, separators=(",", ":"))
         logger.info(f"JSON saved to: {json_path}")
-        
-        # Save Markdown result
-        md_path = os.path.join(self.results_folder, f"result_{timestamp}.md")
-        with open(md_path, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-        logger.info(f"Markdown saved to: {md_path}")
 
         return final_result
 
-    def cleanup(self) -> None:
-        """Clean up temporary files"""
-        for temp_file in self.temp_files:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                    logger.info(f"Temporary file removed: {temp_file}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove temporary file {temp_file}: {str(e)}")
-        
-        self.temp_files.clear()
+    def cleanup(self, keep: Iterable[str] = ()) -> None:
+        """Clean up temporary files, except those of the jobs listed in `keep`"""
+        self.spool.stop_janitor()
+        self.spool.release_all(keep=set(keep))
 
     @staticmethod
     def clean_transcript(transcript: str) -> str:
         """Clean up the transcript by removing timestamps and other markers"""
-        if not transcript:
-            return ""
-            
-        lines = transcript.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            if not line.strip() or re.match(r'^\[\d{2}:\d{2}:\d{2}\.\d{3} -->', line):
-                continue
-                
-            line = re.sub(r'\[\d{2}:\d{2}:\d{2}\.\d{3} -->\s*\d{2}:\d{2}:\d{2}\.\d{3}\]\s*', '', line)
-            line = re.sub(r'\*.*?\*', '', line)
-            
-            if line.strip():
-                cleaned_lines.append(line.strip())
-        
-        return '\n'.join(cleaned_lines)
+        return normalize_transcript(transcript).plain_text
@@ -0,0 +1,291 @@
+import os
+import time
+import wave
+import sqlite3
+import logging
+import json
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from exporters import result_segments
+from transcript_normalizer import Segment
+
+logger = logging.getLogger("fingerprint")
+
+INDEX_PATH = os.getenv(
+    "STUDYFLOW_FINGERPRINT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "fingerprints.db")
+)
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 4096  # 256 ms analysis frames
+HOP_SAMPLES = 256  # One sub-fingerprint every 16 ms, so any start offset is within 8 ms of the grid
+HOP_SECONDS = HOP_SAMPLES / SAMPLE_RATE
+READ_FRAMES = 1024  # Frames analysed per read (about 16 s of audio)
+
+# 33 log-spaced bands give the 32 energy differences of a sub-fingerprint
+BANDS = 33
+LOW_HZ = 300.0
+HIGH_HZ = 2000.0
+
+# Only every INDEX_STRIDE-th reference frame is indexed; every query frame is probed
+INDEX_STRIDE = 4
+# Upper bound on the query frames looked up in the index
+MAX_PROBES = 8192
+# Candidates need this many agreeing offsets before the bit error rate is checked
+MIN_VOTES = 4
+# Sub-fingerprints compared per verification block (about 8 s)
+BLOCK_FRAMES = 256
+# Blocks with more differing bits than this are not the same audio
+MAX_BIT_ERROR_RATE = float(os.getenv("STUDYFLOW_FINGERPRINT_MAX_BER", "0.35"))
+# Share of the new upload the stored transcript must cover to be reused
+MIN_COVERAGE = float(os.getenv("STUDYFLOW_FINGERPRINT_MIN_COVERAGE", "0.9"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fp_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    result_path TEXT NOT NULL,
+    frames INTEGER NOT NULL,
+    prints BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hashes (
+    hash INTEGER NOT NULL,
+    fp_id INTEGER NOT NULL,
+    frame INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS hashes_hash ON hashes (hash);
+"""
+
+_BIT_WEIGHTS = (np.uint32(1) << np.arange(32, dtype=np.uint32)).astype(np.uint32)
+
+
+def _band_matrix() -> np.ndarray:
+    """Matrix summing FFT power bins into the log-spaced bands"""
+    freqs = np.fft.rfftfreq(FRAME_SAMPLES, 1.0 / SAMPLE_RATE)
+    edges = np.geomspace(LOW_HZ, HIGH_HZ, BANDS + 1)
+    matrix = np.zeros((len(freqs), BANDS), dtype=np.float32)
+    for band in range(BANDS):
+        matrix[(freqs >= edges[band]) & (freqs < edges[band + 1]), band] = 1.0
+    return matrix
+
+
+_BANDS = _band_matrix()
+_WINDOW = np.hanning(FRAME_SAMPLES).astype(np.float32)
+
+
+def band_energies(samples: np.ndarray) -> np.ndarray:
+    """Energy in each band of every complete, overlapping analysis frame"""
+    count = 1 + (len(samples) - FRAME_SAMPLES) // HOP_SAMPLES if len(samples) >= FRAME_SAMPLES else 0
+    if count == 0:
+        return np.zeros((0, BANDS), dtype=np.float32)
+    frames = np.lib.stride_tricks.as_strided(
+        samples, shape=(count, FRAME_SAMPLES),
+        strides=(samples.strides[0] * HOP_SAMPLES, samples.strides[0])
+    )
+    spectrum = np.fft.rfft(frames * _WINDOW, axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+    return power @ _BANDS
+
+
+def sub_fingerprints(energies: np.ndarray) -> np.ndarray:
+    """
+    32-bit sub-fingerprints from consecutive band energies: bit m is set when
+    the energy difference between bands m and m+1 grows from one frame to the next.
+    """
+    if len(energies) < 2:
+        return np.zeros(0, dtype=np.uint32)
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    return (bits.astype(np.uint32) * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint32)
+
+
+def fingerprint_wav(wav_path: str) -> np.ndarray:
+    """Fingerprint a 16 kHz mono WAV, reading it in bounded blocks"""
+    prints = []
+    carry = np.zeros(0, dtype=np.float32)
+    previous = None
+    with wave.open(wav_path, "rb") as source:
+        if source.getframerate() != SAMPLE_RATE or source.getnchannels() != 1:
+            raise ValueError(f"Expected 16 kHz mono audio: {wav_path}")
+        while True:
+            data = source.readframes(HOP_SAMPLES * READ_FRAMES)
+            if not data:
+                break
+            samples = np.concatenate((carry, np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0))
+            energies = band_energies(samples)
+            if len(energies) == 0:
+                carry = samples
+                continue
+            # Keep the samples the next block's first frame still needs
+            carry = samples[len(energies) * HOP_SAMPLES:]
+            if previous is not None:
+                energies = np.vstack((previous, energies))
+            prints.append(sub_fingerprints(energies))
+            previous = energies[-1:]
+    return np.concatenate(prints) if prints else np.zeros(0, dtype=np.uint32)
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    """Share of differing bits between two aligned fingerprint blocks"""
+    differing = np.unpackbits(np.bitwise_xor(a, b).view(np.uint8)).sum()
+    return float(differing) / (32 * len(a))
+
+
+class FingerprintMatch:
+    """A stored transcript whose audio contains the new upload"""
+    def __init__(self, job_id: str, result_path: str, offset_frames: int, coverage: float, bit_error_rate: float):
+        self.job_id = job_id
+        self.result_path = result_path
+        self.offset_frames = offset_frames
+        self.coverage = coverage
+        self.bit_error_rate = bit_error_rate
+        self._result: Optional[Dict] = None
+
+    @property
+    def offset_seconds(self) -> float:
+        """Time in the stored recording at which the new upload starts"""
+        return self.offset_frames * HOP_SECONDS
+
+    def result(self) -> Dict:
+        """The stored result, read once"""
+        if self._result is None:
+            with open(self.result_path, encoding="utf-8") as f:
+                self._result = json.load(f)
+        return self._result
+
+    def aligned_segments(self, duration: float) -> List[Segment]:
+        """The stored transcript's segments moved onto the new upload's timeline"""
+        result = self.result()
+        offset = self.offset_seconds
+        segments = []
+        for segment in result_segments(result):
+            start, end = segment.start - offset, segment.end - offset
+            if end <= 0 or start >= duration:
+                continue
+            segments.append(Segment(max(0.0, start), min(duration, end), segment.text))
+        return segments
+
+
+class FingerprintIndex:
+    """
+    SQLite index of the acoustic fingerprints of transcribed audio.
+
+    Sub-fingerprints are looked up exactly, candidates are ranked by how many
+    lookups agree on the same time offset, and the best ones are confirmed by
+    comparing whole blocks of fingerprints bit by bit, which tolerates the
+    errors re-encoding introduces.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (lookups run in worker threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, job_id: str, result_path: str, prints: np.ndarray) -> None:
+        """Index the fingerprint of a finished job's audio"""
+        if len(prints) == 0:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN")
+        try:
+            cursor = conn.execute(
+                "INSERT INTO fingerprints (job_id, result_path, frames, prints, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, result_path, len(prints), prints.astype("<u4").tobytes(), time.time())
+            )
+            fp_id = cursor.lastrowid
+            frames = np.arange(0, len(prints), INDEX_STRIDE)
+            conn.executemany(
+                "INSERT INTO hashes (hash, fp_id, frame) VALUES (?, ?, ?)",
+                ((int(prints[frame]), fp_id, int(frame)) for frame in frames if prints[frame] != 0)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Indexed fingerprint of job {job_id} ({len(prints)} frames)")
+
+    def _candidates(self, prints: np.ndarray) -> Counter:
+        """Votes per (fp_id, offset) from exact sub-fingerprint lookups"""
+        step = max(1, len(prints) // MAX_PROBES)
+        probes: Dict[int, List[int]] = {}
+        for frame in range(0, len(prints), step):
+            value = int(prints[frame])
+            if value != 0:
+                probes.setdefault(value, []).append(frame)
+
+        votes: Counter = Counter()
+        conn = self._connect()
+        values = list(probes)
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            placeholders = ", ".join("?" for _ in batch)
+            rows = conn.execute(
+                f"SELECT hash, fp_id, frame FROM hashes WHERE hash IN ({placeholders})", batch
+            )
+            for value, fp_id, frame in rows:
+                for query_frame in probes[value]:
+                    votes[(fp_id, frame - query_frame)] += 1
+        return votes
+
+    def _verify(self, prints: np.ndarray, fp_id: int, offset: int) -> Optional[FingerprintMatch]:
+        row = self._connect().execute(
+            "SELECT job_id, result_path, prints FROM fingerprints WHERE fp_id = ?", (fp_id,)
+        ).fetchone()
+        if row is None or not os.path.exists(row[1]):
+            return None
+        reference = np.frombuffer(row[2], dtype="<u4")
+
+        # Query frame q lines up with reference frame q + offset
+        first = max(0, -offset)
+        last = min(len(prints), len(reference) - offset)
+        matched = 0
+        errors = []
+        for start in range(first, last, BLOCK_FRAMES):
+            end = min(start + BLOCK_FRAMES, last)
+            error = bit_error_rate(prints[start:end], reference[start + offset:end + offset])
+            if error < MAX_BIT_ERROR_RATE:
+                matched += end - start
+                errors.append(error)
+        coverage = matched / len(prints)
+        if coverage < MIN_COVERAGE:
+            return None
+        return FingerprintMatch(row[0], row[1], offset, coverage, float(np.mean(errors)))
+
+    def lookup(self, prints: np.ndarray) -> Optional[FingerprintMatch]:
+        """Find previously transcribed audio covering this fingerprint, if any"""
+        if len(prints) < BLOCK_FRAMES:
+            return None
+        started = time.perf_counter()
+        votes = self._candidates(prints)
+        for (fp_id, offset), count in votes.most_common(3):
+            if count < MIN_VOTES:
+                break
+            match = self._verify(prints, fp_id, offset)
+            if match:
+                logger.info(f"Fingerprint matches job {match.job_id} at {match.offset_seconds:.2f}s "
+                            f"(coverage {match.coverage:.0%}, BER {match.bit_error_rate:.2f}, "
+                            f"{time.perf_counter() - started:.2f}s)")
+                return match
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_index() -> FingerprintIndex:
+    return FingerprintIndex(INDEX_PATH)
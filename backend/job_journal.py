@@ -0,0 +1,267 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("job_journal")
+
+# Job states recorded in the journal
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Give up on a job that keeps taking the process down with it
+MAX_ATTEMPTS = int(os.getenv("STUDYFLOW_MAX_JOB_ATTEMPTS", "3"))
+
+# Identifies this process run; PIDs repeat across container restarts (the server is often PID 1)
+BOOT_TOKEN = uuid.uuid4().hex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    audio_path TEXT NOT NULL,
+    duration REAL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    enable_summary INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    owner_pid INTEGER,
+    owner_token TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE TABLE IF NOT EXISTS uploads (
+    upload_id TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    part_size INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS upload_parts (
+    upload_id TEXT NOT NULL,
+    part_number INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (upload_id, part_number)
+);
+"""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """Check whether a process with this pid still exists"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobJournal:
+    """
+    Disk-backed record of job state transitions (SQLite in WAL mode).
+
+    Every transition is committed before the work it describes starts, so after a
+    crash or restart the journal tells which jobs have to be run again.
+    API keys are never written to the journal.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "owner_token" not in columns:
+                # Journals written before jobs were owned by boot token
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner_token TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection (jobs update the journal from worker threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, job_id: str, client_id: str, audio_path: str, duration: Optional[float] = None,
+            priority: int = 0, enable_summary: bool = False, upload_id: Optional[str] = None) -> None:
+        """Record a newly accepted job; the records of the upload it comes from are dropped with it"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, client_id, audio_path, duration, priority, enable_summary, "
+                "state, owner_pid, owner_token, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, client_id, audio_path, duration, priority, int(enable_summary),
+                 QUEUED, os.getpid(), BOOT_TOKEN, now, now)
+            )
+            if upload_id is not None:
+                conn.execute("DELETE FROM upload_parts WHERE upload_id = ?", (upload_id,))
+                conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def set_duration(self, job_id: str, duration: float) -> None:
+        self._update(job_id, duration=duration)
+
+    def mark_running(self, job_id: str) -> None:
+        self._connect().execute(
+            "UPDATE jobs SET state = ?, owner_pid = ?, owner_token = ?, attempts = attempts + 1, "
+            "updated_at = ? WHERE job_id = ?",
+            (RUNNING, os.getpid(), BOOT_TOKEN, time.time(), job_id)
+        )
+
+    def mark_done(self, job_id: str, result_path: Optional[str] = None) -> None:
+        self._update(job_id, state=DONE, result_path=result_path, error=None)
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self._update(job_id, state=FAILED, error=error)
+
+    def _update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET {columns} WHERE job_id = ?",
+            (*fields.values(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def unfinished(self) -> List[Dict]:
+        """Jobs that are still queued or running"""
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim_interrupted(self) -> List[Dict]:
+        """
+        Take ownership of unfinished jobs whose owning process is gone.
+
+        Jobs carrying this run's boot token are ours and still live. Otherwise the
+        owner is presumed alive only if its PID exists and is not our own, since a
+        restarted container reuses the PID of the run that was interrupted.
+
+        Jobs whose audio has disappeared, or that already used up their attempts,
+        are marked failed instead of being returned.
+        """
+        conn = self._connect()
+        claimed = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+            now = time.time()
+            for row in rows:
+                job = dict(row)
+                if job["owner_token"] == BOOT_TOKEN:
+                    continue
+                if job["owner_pid"] != os.getpid() and _pid_alive(job["owner_pid"]):
+                    continue
+                if job["attempts"] >= MAX_ATTEMPTS:
+                    error = f"Gave up after {job['attempts']} interrupted attempts"
+                elif not os.path.exists(job["audio_path"]):
+                    error = "Audio file missing after restart"
+                else:
+                    error = None
+
+                if error:
+                    conn.execute(
+                        "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                        (FAILED, error, now, job["job_id"])
+                    )
+                    logger.warning(f"Not recovering job {job['job_id']}: {error}")
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET state = ?, owner_pid = ?, owner_token = ?, updated_at = ? WHERE job_id = ?",
+                    (QUEUED, os.getpid(), BOOT_TOKEN, now, job["job_id"])
+                )
+                job["state"] = QUEUED
+                job["owner_pid"] = os.getpid()
+                job["owner_token"] = BOOT_TOKEN
+                claimed.append(job)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def add_upload(self, upload_id: str, client_id: str, path: str, size: int, part_size: int) -> None:
+        """Record a newly initiated chunked upload"""
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO uploads (upload_id, client_id, path, size, part_size, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (upload_id, client_id, path, size, part_size, now, now)
+        )
+
+    def get_upload(self, upload_id: str) -> Optional[Dict]:
+        """An upload with the numbers of its acknowledged parts"""
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM uploads WHERE upload_id = ?", (upload_id,)).fetchone()
+        if row is None:
+            return None
+        upload = dict(row)
+        upload["parts"] = [part[0] for part in conn.execute(
+            "SELECT part_number FROM upload_parts WHERE upload_id = ? ORDER BY part_number", (upload_id,)
+        )]
+        return upload
+
+    def ack_part(self, upload_id: str, part_number: int, sha256: str) -> None:
+        """Record a part as durably written; re-sending a part replaces its record"""
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO upload_parts (upload_id, part_number, sha256) VALUES (?, ?, ?)",
+            (upload_id, part_number, sha256)
+        )
+        conn.execute("UPDATE uploads SET updated_at = ? WHERE upload_id = ?", (time.time(), upload_id))
+
+    def complete_upload(self, upload_id: str) -> bool:
+        """Mark an upload complete; False when another request already did"""
+        cursor = self._connect().execute(
+            "UPDATE uploads SET completed = 1, updated_at = ? WHERE upload_id = ? AND completed = 0",
+            (time.time(), upload_id)
+        )
+        return cursor.rowcount == 1
+
+    def reopen_upload(self, upload_id: str) -> None:
+        """Undo complete_upload when the job could not be started"""
+        self._connect().execute(
+            "UPDATE uploads SET completed = 0, updated_at = ? WHERE upload_id = ?", (time.time(), upload_id)
+        )
+
+    def remove_upload(self, upload_id: str) -> None:
+        conn = self._connect()
+        conn.execute("DELETE FROM upload_parts WHERE upload_id = ?", (upload_id,))
+        conn.execute("DELETE FROM uploads WHERE upload_id = ?", (upload_id,))
+
+    def open_uploads(self) -> List[Dict]:
+        """Uploads still waiting for parts or for completion"""
+        rows = self._connect().execute(
+            "SELECT * FROM uploads WHERE completed = 0 ORDER BY created_at"
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,75 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger("language_id")
+
+# Characters of text examined, spread over the start, middle and end of the transcript
+SAMPLE_CHARS = int(os.getenv("STUDYFLOW_LANGUAGE_SAMPLE_CHARS", "1500"))
+CACHE_SIZE = 256
+FALLBACK_LANGUAGE = "en"
+
+_lock = threading.Lock()
+_factory_ready = False
+_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def sample_text(text: str, sample_chars: int = SAMPLE_CHARS) -> str:
+    """Take up to `sample_chars` characters from three evenly spaced windows"""
+    if len(text) <= sample_chars:
+        return text
+    window = sample_chars // 3
+    middle = (len(text) - window) // 2
+    windows = (text[:window], text[middle:middle + window], text[-window:])
+    return " ".join(windows)
+
+
+def warm_up() -> None:
+    """Load the langdetect profiles once, with a fixed seed for stable answers"""
+    global _factory_ready
+    with _lock:
+        if _factory_ready:
+            return
+        from langdetect import DetectorFactory, detector_factory
+        DetectorFactory.seed = 0
+        detector_factory.init_factory()
+        _factory_ready = True
+
+
+def identify_language(text: str, hint: Optional[str] = None) -> str:
+    """
+    Return the ISO code of the text's language.
+
+    A language already known for the text (e.g. detected by whisper) is passed
+    as `hint` and returned as is. Otherwise a bounded sample of the text is
+    classified, so the cost does not grow with transcript length, and answers
+    are cached by sample.
+    """
+    if hint:
+        return hint
+    sample = sample_text(text.strip())
+    if not sample:
+        return FALLBACK_LANGUAGE
+
+    key = hashlib.blake2b(sample.encode("utf-8"), digest_size=16).hexdigest()
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    warm_up()
+    try:
+        from langdetect import detect
+        language = detect(sample)
+    except Exception as e:
+        logger.debug(f"Language detection failed, using fallback: {str(e)}")
+        language = FALLBACK_LANGUAGE
+
+    with _lock:
+        _cache[key] = language
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return language
@@ -1,22 +1,34 @@
 import os
-import re
 import json
 import uuid
-import shutil
+import signal
 import asyncio
 import logging
-import signal
 import datetime
+import threading
 import subprocess
-from typing import Dict, Optional
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from typing import Dict, Optional, Set
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 # Import relative modules
-from audio_processor import transcribe_audio, get_audio_duration
-from summarizer import generate_bullet_summary, generate_detailed_summary
+from audio_processor import (TranscriptionInterrupted, get_audio_duration, resolve_draft_model,
+                             terminate_transcriptions, transcribe_audio)
+from summarizer import SectionSummarizer, generate_bullet_summary, generate_detailed_summary
+from language_id import identify_language
+from transcript_normalizer import TranscriptNormalizer, normalize_transcript
+from exporters import FORMATS, RenderCache, accepts_gzip, encoded_etag, etag_matches, export_etag
 from websocket_manager import WebSocketManager
 from file_handler import FileHandler
+from scheduler import JobDeferred, JobScheduler
+from job_journal import JobJournal, DONE, FAILED
+from spool import DECODED_BYTES_PER_SECOND, SpoolError, SpoolFull, UploadTooLarge
+from uploads import (MAX_PART_SIZE, PartRejected, UploadAlreadyCompleted, UploadIncomplete, UploadManager,
+                     UploadNotFound)
+from startup import report as startup_report, run_startup
+from shared_state import create_state_backend
+from rate_limiter import limiter_metrics
 
 # Create FastAPI app
 app = FastAPI()
@@ -37,7 +49,11 @@ shutdown_event = asyncio.Event()
 class TranscribeTask:
     """Class to store transcription state data"""
     def __init__(self):
-        self.audio_duration = None
+        self.job_ids: Dict[str, Set[str]] = {}  # client_id -> job_ids of its running jobs
+        self.draining = False  # Set on shutdown: refuse new jobs, let running ones finish
+        self.drain: Optional[asyncio.Task] = None  # Waits for running jobs, started by the first signal
+        self.recovered = set()  # Tasks running jobs recovered from the journal
+        self.refining = set()  # Tasks finishing jobs whose draft was already returned
 
 # Initialize transcribe task
 transcribe_task = TranscribeTask()
@@ -51,21 +67,69 @@ logger = logging.getLogger("main")
 ws_manager = WebSocketManager()
 file_handler = FileHandler(os.path.dirname(os.path.abspath(__file__)))
 
+# Progress, estimates and results reach the client through the worker holding its WebSocket
+state = create_state_backend()
+
+async def deliver(client_id: str, message: Dict):
+    """Send an event to a client connected to this process"""
+    websocket = active_connections.get(client_id)
+    if websocket is None:
+        return
+    try:
+        await websocket.send_json(message)
+    except Exception as e:
+        logger.warning(f"Failed to deliver {message.get('type')} event to client {client_id}: {str(e)}")
+        active_connections.pop(client_id, None)
+
+async def send_queue_update(client_id: str, message: Dict):
+    """Forward scheduler estimates to the client's WebSocket"""
+    await state.publish(client_id, message)
+
+scheduler = JobScheduler(notify=send_queue_update)
+render_cache = RenderCache()
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+journal = JobJournal(os.getenv("STUDYFLOW_JOURNAL_PATH", os.path.join(RESULTS_FOLDER, "jobs.db")))
+uploads = UploadManager(journal, file_handler.spool)
+
+# Seconds running jobs get to finish once SIGTERM arrives; whisper is stopped past it and
+# the jobs are recovered on next start. Run uvicorn with a longer --timeout-graceful-shutdown.
+DRAIN_TIMEOUT = float(os.getenv("STUDYFLOW_DRAIN_TIMEOUT", "300"))
+# Silence trimming before whisper; the VAD module (and NumPy) is only imported when enabled
+VAD_ENABLED = os.getenv("STUDYFLOW_VAD", "1") not in ("0", "false", "False")
+# Reuse the transcript of previously transcribed audio that an upload re-encodes
+DEDUP_ENABLED = os.getenv("STUDYFLOW_DEDUP", "1") not in ("0", "false", "False")
+
+def begin_drain() -> asyncio.Task:
+    """Refuse new jobs and start draining the running ones; later calls return the same drain"""
+    if transcribe_task.drain is None:
+        transcribe_task.draining = True
+        scheduler.begin_drain()
+        logger.info("Initiating graceful shutdown, draining running jobs...")
+        transcribe_task.drain = asyncio.create_task(drain_jobs())
+    return transcribe_task.drain
+
+async def drain_jobs():
+    """Wait for the running jobs until the drain deadline, then stop whisper"""
+    # Queued and unfinished jobs stay in the journal and are recovered on next start
+    try:
+        await asyncio.wait_for(scheduler.drain(), DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        stopped = terminate_transcriptions()
+        logger.warning(f"Drain deadline reached, stopped {stopped} whisper run(s); "
+                       "their jobs are recovered on next start")
+        await scheduler.drain()
+
 async def shutdown():
     """Gracefully shut down the application"""
-    logger.info("Initiating graceful shutdown...")
-    file_handler.cleanup()
+    if shutdown_event.is_set():
+        return
+    await begin_drain()
+    # Unfinished chunked uploads are kept too, so clients can resume them after the restart
+    keep = [job["job_id"] for job in await asyncio.to_thread(journal.unfinished)]
+    keep += [upload["upload_id"] for upload in await asyncio.to_thread(uploads.open_uploads)]
+    file_handler.cleanup(keep=keep)
     ws_manager.shutdown_event.set()
-
-def signal_handler(signum, frame):
-    """Handle shutdown signals by scheduling the shutdown coroutine"""
-    logger.info(f"Received signal {signum}. Initiating graceful shutdown...")
-    loop = asyncio.get_event_loop()
-    loop.create_task(shutdown())
-
-# Register signal handlers
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
+    shutdown_event.set()
 
 def convert_to_16khz_wav(input_path: str, output_path: str) -> bool:
     """
@@ -104,57 +168,57 @@ def clean_transcript(transcript: str) -> str:
     """
     Supprime les repères temporels au format [HH:MM:SS.mmm --> HH:MM:SS.mmm] du transcript.
     """
-    # First, check if we have content
-    if not transcript:
-        return ""
-        
-    # Remove timestamp lines and clean up
-    lines = transcript.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        # Skip empty lines and pure timestamp lines
-        if not line.strip() or re.match(r'^\[\d{2}:\d{2}:\d{2}\.\d{3} -->', line):
-            continue
-            
-        # Remove timestamps from lines that have them
-        line = re.sub(r'\[\d{2}:\d{2}:\d{2}\.\d{3} -->\s*\d{2}:\d{2}:\d{2}\.\d{3}\]\s*', '', line)
-        
-        # Remove music markers if present
-        line = re.sub(r'\*.*?\*', '', line)
-        
-        # Add non-empty cleaned lines
-        if line.strip():
-            cleaned_lines.append(line.strip())
-    
-    return '\n'.join(cleaned_lines)
+    return normalize_transcript(transcript).plain_text
 
-@app.post("/transcribe/")
-async def transcribe(
-    file: UploadFile = File(...),
-    enable_summary: bool = Form(False),
-    api_key: Optional[str] = Form(None),
-    client_id: str = Form(...)  # New: require client_id for WebSocket updates
-):
-    temp_files = []  # Keep track of temporary files for cleanup
-    results_folder = os.path.join(os.path.dirname(__file__), "results")
+def find_duplicate(audio_path: str, wav_path: str):
+    """
+    Decode the upload to 16 kHz WAV at `wav_path`, fingerprint it and look it up
+    among transcribed jobs. Returns (fingerprint, match); both are None when
+    decoding or fingerprinting fails.
+    """
+    try:
+        from fingerprint import fingerprint_wav, get_index
+        from vad import decode_to_wav
+        decode_to_wav(audio_path, wav_path)
+        prints = fingerprint_wav(wav_path)
+        return prints, get_index().lookup(prints)
+    except Exception as e:
+        logger.warning(f"Fingerprint lookup failed, transcribing normally: {str(e)}")
+        return None, None
+
+async def run_job(
+    job_id: str,
+    client_id: str,
+    audio_path: str,
+    enable_summary: bool = False,
+    api_key: Optional[str] = None,
+    priority: int = 0,
+    draft_ready: Optional[asyncio.Future] = None,
+    pipelined_summary: bool = False
+) -> Dict:
+    """
+    Run a journaled transcription job end to end and return its result.
+
+    When `draft_ready` is given and a draft model is installed, a fast draft is
+    set on it before the full model runs, and the full model's segments are
+    pushed to the client as they are decoded.
+
+    With `pipelined_summary`, finished sections of the transcript are summarized
+    while whisper keeps decoding and merged once it is done.
+    """
+    results_folder = RESULTS_FOLDER
     os.makedirs(results_folder, exist_ok=True)
 
-    logger.info(f"Starting transcription for client {client_id}")
+    transcribe_task.job_ids.setdefault(client_id, set()).add(job_id)
+    logger.info(f"Starting transcription job {job_id} for client {client_id}")
+    sections = None
     
     try:
-        # Save uploaded file temporarily
-        audio_path = os.path.join(os.path.dirname(__file__), f"temp_{uuid.uuid4()}.wav")
-        temp_files.append(audio_path)
-        
-        with open(audio_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
         loop = asyncio.get_event_loop()
 
         async def progress_callback(progress: int):
             try:
-                await send_progress(client_id, progress)
+                await send_progress(client_id, progress, job_id, audio_duration)
             except Exception as e:
                 logger.error(f"Failed to send progress update: {str(e)}")
                 # Don't re-raise here to allow transcription to continue even if WebSocket fails
@@ -187,7 +251,7 @@ async def transcribe(
                         time_since_last = current_time - last_update_time
                         progress_change = abs(progress - last_sent_progress)
                         
-                        if (time_since_last >= 0.1 or progress_change >= 2) and client_id in active_connections:
+                        if time_since_last >= 0.1 or progress_change >= 2:
                             await progress_callback(progress)
                             last_update_time = current_time
                             last_sent_progress = progress
@@ -210,18 +274,118 @@ async def transcribe(
         try:
             # Run transcription with progress updates
             audio_duration = get_audio_duration(audio_path)
-            transcribe_task.audio_duration = audio_duration
+            await state.set_status(client_id, {"jobId": job_id, "duration": audio_duration})
+            await asyncio.to_thread(journal.set_duration, job_id, audio_duration)
             
             # Send audio duration update to the client
-            if client_id in active_connections:
-                await active_connections[client_id].send_json({
-                    "type": "connected",
-                    "audioInfo": {
-                        "duration": audio_duration
-                    }
-                })
+            await state.publish(client_id, {
+                "type": "connected",
+                "audioInfo": {
+                    "duration": audio_duration
+                }
+            })
             
-            transcription = transcribe_audio(audio_path, progress_callback=sync_progress_callback)
+            detected = {}
+            fingerprinted = {}
+            # Fed line by line from whisper's stdout while it decodes
+            normalizer = TranscriptNormalizer()
+            if pipelined_summary and enable_summary and api_key:
+                sections = SectionSummarizer(api_key, loop, language=lambda: detected.get("language"))
+
+            def run_transcription():
+                journal.mark_running(job_id)
+                speech = None
+                decoded_path = speech_path = None
+                if audio_duration <= 0:
+                    # Without a duration the decoded size cannot be reserved, so nothing is decoded
+                    logger.warning(f"Unknown duration for job {job_id}, transcribing the upload as is")
+                elif VAD_ENABLED or DEDUP_ENABLED:
+                    # Decoded PCM is far larger than the upload, so it is accounted on the disk spool
+                    decoded_size = int(audio_duration * DECODED_BYTES_PER_SECOND)
+                    try:
+                        decoded_path = file_handler.spool.reserve_derived(job_id, ".16k.wav", decoded_size)
+                        if VAD_ENABLED:
+                            speech_path = file_handler.spool.reserve_derived(job_id, ".speech.wav", decoded_size)
+                    except SpoolError as e:
+                        logger.warning(f"No spool space to decode job {job_id}, transcribing the upload as is: {str(e)}")
+                if DEDUP_ENABLED and decoded_path:
+                    # Looked up first: on a match, trimming silence would be wasted work
+                    prints, match = find_duplicate(audio_path, decoded_path)
+                    fingerprinted.update(prints=prints, match=match)
+                    if match:
+                        # Same lecture in another encoding: reuse its transcript, aligned to this upload
+                        normalizer.extend(match.aligned_segments(audio_duration))
+                        detected["language"] = match.result().get("language")
+                        sync_progress_callback(100)
+                        return 0.0
+                if speech_path:
+                    # Drop long non-speech stretches so whisper only decodes speech
+                    try:
+                        from vad import trim_silence
+                        speech = trim_silence(audio_path, decoded_path, speech_path,
+                                              decoded=fingerprinted.get("prints") is not None)
+                    except Exception as e:
+                        logger.warning(f"Silence trimming failed, using original audio: {str(e)}")
+                if speech:
+                    normalizer.offset_map = speech.offset_map
+                drafted = False
+                draft_model = resolve_draft_model() if draft_ready is not None else None
+                if draft_model:
+                    try:
+                        # Small model first: the client gets a usable transcript within seconds
+                        draft = TranscriptNormalizer(normalizer.offset_map)
+                        hint = {}
+                        transcribe_audio(speech.path if speech else audio_path,
+                                         audio_duration=speech.speech_duration if speech else audio_duration,
+                                         language_callback=lambda code: hint.update(language=code),
+                                         line_callback=draft.feed,
+                                         model_path=draft_model)
+                        # The draft's language is only a hint for display: the full model
+                        # detects it again, so a misdetection by the small model is not kept
+                        loop.call_soon_threadsafe(set_draft, {
+                            "jobId": job_id,
+                            "draft": True,
+                            "transcription": draft.timestamped_text,
+                            "segments": draft.segment_dicts(),
+                            "language": hint.get("language")
+                        })
+                        drafted = True
+                    except Exception as e:
+                        logger.warning(f"Draft transcription failed, running the full model only: {str(e)}")
+                transcribe_audio(speech.path if speech else audio_path,
+                                 progress_callback=sync_progress_callback,
+                                 audio_duration=speech.speech_duration if speech else audio_duration,
+                                 language_callback=lambda code: detected.update(language=code),
+                                 line_callback=lambda line: handle_line(line, drafted))
+                return speech.seconds_saved if speech else 0.0
+
+            def set_draft(draft: Dict):
+                if not draft_ready.done():
+                    draft_ready.set_result(draft)
+
+            def handle_line(line: str, drafted: bool):
+                segment = normalizer.feed(line)
+                if segment is None:
+                    return
+                if drafted:
+                    # Refined segments replace the draft on the client as they are decoded
+                    asyncio.run_coroutine_threadsafe(state.publish(client_id, {
+                        "type": "segment",
+                        "jobId": job_id,
+                        "segment": segment.to_dict()
+                    }), loop)
+                if sections is not None:
+                    # Finished sections are summarized while whisper keeps decoding
+                    sections.add(segment.text)
+
+            # Wait for a worker slot; short jobs and under-served clients go first
+            seconds_saved = await scheduler.submit(
+                job_id,
+                client_id,
+                audio_duration,
+                run_transcription,
+                priority=priority
+            )
         finally:
             # Clean up the monitoring task
             logger.debug("Cleaning up progress monitoring")
@@ -234,71 +398,402 @@ async def transcribe(
         # Create timestamped filename for transcript
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Process timestamps from transcription
-        text_with_timestamps = transcription
-        # Extract plain text for summary if needed
-        plain_text = re.sub(r'\[\d{2}:\d{2}:\d{2}\] ', '', transcription)
+        # Timestamped text, plain text and segments all come from the single normalizer pass
+        text_with_timestamps = normalizer.timestamped_text
+        plain_text = normalizer.plain_text
         
         final_result = {
-            "transcription": text_with_timestamps
+            "jobId": job_id,
+            "transcription": text_with_timestamps,
+            "segments": normalizer.segment_dicts(),
+            "silenceTrimmed": round(seconds_saved, 1),
+            "language": detected.get("language")
         }
+        match = fingerprinted.get("match")
+        if match:
+            logger.info(f"Job {job_id}: reused the transcript of job {match.job_id} "
+                        f"(offset {match.offset_seconds:.2f}s, coverage {match.coverage:.0%})")
+            final_result["duplicateOf"] = match.job_id
+        if seconds_saved > 0:
+            logger.info(f"Job {job_id}: silence trimming saved {seconds_saved:.1f}s of audio")
+            await state.publish(client_id, {
+                "type": "vad",
+                "jobId": job_id,
+                "secondsSaved": round(seconds_saved, 1)
+            })
         
         if enable_summary and api_key:
             if len(plain_text.strip()) < 10:
                 raise ValueError("Text too short to generate summary")
             
-            bullet_summary = await generate_bullet_summary(plain_text, api_key)
-            logger.info("Generated bullet summary")
-            final_result["petitResume"] = bullet_summary
+            # Reuse whisper's language; fall back to text detection at most once per job
+            if not final_result["language"]:
+                resolved = sections.lang_code if sections is not None else None
+                final_result["language"] = resolved or identify_language(plain_text)
+            lang_code = final_result["language"]
             
-            detailed_summary = await generate_detailed_summary(plain_text, api_key)
-            logger.info("Generated detailed summary")
-            final_result["grosResume"] = detailed_summary
-
-        # Save markdown version
-        markdown_content = f"""# Transcription {timestamp}
-### Transcription:
-{text_with_timestamps}
-"""
-        if "petitResume" in final_result:
-            markdown_content += f"""
-### Key Points:
-{final_result['petitResume']}
-"""
-        if "grosResume" in final_result:
-            markdown_content += f"""
-### Detailed Summary:
-{final_result['grosResume']}
-"""
-
-        # Save results
-        output_path_json = os.path.join(results_folder, f"result_{timestamp}.json")
+            if sections is not None:
+                bullet_summary, detailed_summary = await sections.finish(plain_text, lang_code)
+                logger.info("Merged section summaries")
+                final_result["petitResume"] = bullet_summary
+                final_result["grosResume"] = detailed_summary
+            else:
+                bullet_summary = await generate_bullet_summary(plain_text, api_key, lang_code)
+                logger.info("Generated bullet summary")
+                final_result["petitResume"] = bullet_summary
+                
+                detailed_summary = await generate_detailed_summary(plain_text, api_key, lang_code)
+                logger.info("Generated detailed summary")
+                final_result["grosResume"] = detailed_summary
+
+        # Save results; other formats are rendered on demand by the export endpoint
+        output_path_json = os.path.join(results_folder, f"result_{timestamp}_{job_id[:8]}.json")
         with open(output_path_json, "w", encoding="utf-8") as f:
-            json.dump(final_result, f, ensure_ascii=False, indent=4)
+            json.dump(final_result, f, ensure_ascii=False, separators=(",", ":"))
         logger.info(f"JSON saved to: {output_path_json}")
-        
-        output_path_md = os.path.join(results_folder, f"result_{timestamp}.md")
-        with open(output_path_md, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
-        logger.info(f"Markdown saved to: {output_path_md}")
 
+        await asyncio.to_thread(journal.mark_done, job_id, output_path_json)
+        if fingerprinted.get("prints") is not None and not match:
+            try:
+                from fingerprint import get_index
+                await asyncio.to_thread(get_index().add, job_id, output_path_json, fingerprinted["prints"])
+            except Exception as e:
+                logger.warning(f"Failed to index fingerprint of job {job_id}: {str(e)}")
         return final_result
 
+    except asyncio.CancelledError:
+        # Interrupted by shutdown: leave the job unfinished in the journal so it is recovered
+        logger.warning(f"Job {job_id} interrupted before completion")
+        raise
+    except (JobDeferred, TranscriptionInterrupted) as e:
+        # Not started or stopped by the drain: also left for recovery instead of failed
+        logger.warning(f"Job {job_id} left for recovery: {str(e)}")
+        raise
     except Exception as e:
-        logger.error(f"Error in transcribe endpoint: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        await asyncio.to_thread(journal.mark_failed, job_id, str(e))
+        raise
     
     finally:
-        # Clean up all temporary files
-        for temp_file in temp_files:
-            if temp_file and os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                    logger.info(f"Temporary file removed: {temp_file}")
-                except Exception as e:
-                    logger.warning(f"Failed to remove temporary file {temp_file}: {str(e)}")
+        if sections is not None:
+            sections.cancel()
+        # Only drop the audio once the journal no longer needs it for recovery
+        job = await asyncio.to_thread(journal.get, job_id)
+        if job and job["state"] in (DONE, FAILED):
+            file_handler.release_temp_audio(job_id)
         
-        transcribe_task.audio_duration = None  # Clean up audio duration after transcription is done
+        running = transcribe_task.job_ids.get(client_id, set())
+        running.discard(job_id)
+        if not running:
+            transcribe_task.job_ids.pop(client_id, None)
+        # The status belongs to the client: hand it to another of its jobs rather than clearing it
+        if (await state.get_status(client_id)).get("jobId") == job_id:
+            other = await asyncio.to_thread(journal.get, next(iter(running))) if running else None
+            await state.set_status(client_id, {"jobId": other["job_id"], "duration": other["duration"]}
+                                   if other else None)
+
+@app.post("/transcribe/")
+async def transcribe(
+    file: UploadFile = File(...),
+    enable_summary: bool = Form(False),
+    api_key: Optional[str] = Form(None),
+    client_id: str = Form(...),  # New: require client_id for WebSocket updates
+    priority: int = Form(0),
+    draft: bool = Form(False),  # Return a fast draft first, refined segments follow over the WebSocket
+    pipelined_summary: bool = Form(False)  # Summarize sections while whisper is still decoding
+):
+    if transcribe_task.draining:
+        raise HTTPException(status_code=503, detail="Server is shutting down, please retry shortly")
+
+    job_id = str(uuid.uuid4())
+    try:
+        # Spool the upload; admission control rejects it when quotas are exhausted
+        audio_path = await asyncio.to_thread(file_handler.save_temp_audio, file.file, job_id)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except SpoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    return await start_job(job_id, client_id, audio_path, enable_summary, api_key, priority,
+                           draft, pipelined_summary)
+
+async def start_job(
+    job_id: str,
+    client_id: str,
+    audio_path: str,
+    enable_summary: bool,
+    api_key: Optional[str],
+    priority: int,
+    draft: bool,
+    pipelined_summary: bool,
+    from_upload: bool = False
+) -> Dict:
+    """Journal a job whose audio is spooled and run it (or its draft) for the request"""
+    journaled = False
+    try:
+        # A completed upload's records are replaced by the job's in the same transaction
+        await asyncio.to_thread(journal.add, job_id, client_id, audio_path, priority=priority,
+                                enable_summary=enable_summary, upload_id=job_id if from_upload else None)
+        journaled = True
+        if draft:
+            return await run_job_with_draft(job_id, client_id, audio_path, enable_summary, api_key,
+                                            priority, pipelined_summary)
+        return await run_job(job_id, client_id, audio_path, enable_summary, api_key, priority,
+                             pipelined_summary=pipelined_summary)
+
+    except (JobDeferred, TranscriptionInterrupted):
+        raise HTTPException(status_code=503, headers={"Retry-After": "30"},
+                            detail=f"Server is shutting down, the job resumes after the restart, see /jobs/{job_id}")
+    except Exception as e:
+        logger.error(f"Error in transcribe endpoint: {str(e)}", exc_info=True)
+        if not journaled:
+            # Nothing would ever run or recover this job: give the upload back, or free the audio
+            if from_upload:
+                await asyncio.to_thread(uploads.reopen, job_id)
+            else:
+                file_handler.release_temp_audio(job_id)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/uploads")
+async def initiate_upload(
+    client_id: str = Form(...),
+    filename: str = Form(...),
+    size: int = Form(...),
+    part_size: int = Form(0)
+):
+    """Start a resumable chunked upload; the response gives the part layout"""
+    if transcribe_task.draining:
+        raise HTTPException(status_code=503, detail="Server is shutting down, please retry shortly")
+    try:
+        return await asyncio.to_thread(uploads.initiate, client_id, filename, size, part_size)
+    except PartRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except SpoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Part layout and acknowledged parts, for resuming an upload"""
+    try:
+        return await asyncio.to_thread(uploads.status, upload_id)
+    except UploadNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@app.put("/uploads/{upload_id}/parts/{part_number}")
+async def upload_part(upload_id: str, part_number: int, request: Request):
+    """Store one part; its SHA-256 (hex) is sent in the X-Checksum-SHA256 header"""
+    checksum = request.headers.get("x-checksum-sha256")
+    if not checksum:
+        raise HTTPException(status_code=400, detail="Missing X-Checksum-SHA256 header")
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        if not declared.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if int(declared) > MAX_PART_SIZE:
+            raise HTTPException(status_code=413, detail="Part is larger than the maximum part size")
+    # Enforced while reading too: chunked requests carry no Content-Length
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > MAX_PART_SIZE:
+            raise HTTPException(status_code=413, detail="Part is larger than the maximum part size")
+    try:
+        return await asyncio.to_thread(uploads.write_part, upload_id, part_number, data, checksum)
+    except UploadNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PartRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    client_id: Optional[str] = Form(None),
+    enable_summary: bool = Form(False),
+    api_key: Optional[str] = Form(None),
+    priority: int = Form(0),
+    draft: bool = Form(False),
+    pipelined_summary: bool = Form(False)
+):
+    """Finish a chunked upload and run its job; responds like /transcribe/"""
+    if transcribe_task.draining:
+        raise HTTPException(status_code=503, detail="Server is shutting down, please retry shortly")
+    try:
+        # Claimed atomically: of concurrent completions only one starts the job
+        upload = await asyncio.to_thread(uploads.complete, upload_id)
+    except UploadNotFound as e:
+        # The upload's records are dropped once its job is journaled
+        if await asyncio.to_thread(journal.get, upload_id):
+            raise HTTPException(status_code=409, detail=f"Job already started, see /jobs/{upload_id}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadAlreadyCompleted:
+        raise HTTPException(status_code=409, detail=f"Job already started, see /jobs/{upload_id}")
+
+    # The upload id becomes the job id, so the spooled file is already the job's audio.
+    # A resumed upload reports to the WebSocket of the client that completes it.
+    return await start_job(upload_id, client_id or upload["client_id"], upload["path"], enable_summary, api_key,
+                           priority, draft, pipelined_summary, from_upload=True)
+
+async def run_job_with_draft(
+    job_id: str,
+    client_id: str,
+    audio_path: str,
+    enable_summary: bool = False,
+    api_key: Optional[str] = None,
+    priority: int = 0,
+    pipelined_summary: bool = False
+) -> Dict:
+    """Return the draft as soon as it exists and finish the job in the background"""
+    draft_ready = asyncio.get_running_loop().create_future()
+    job = asyncio.create_task(run_job(job_id, client_id, audio_path, enable_summary, api_key,
+                                      priority, draft_ready=draft_ready,
+                                      pipelined_summary=pipelined_summary))
+    await asyncio.wait({job, draft_ready}, return_when=asyncio.FIRST_COMPLETED)
+    if job.done():
+        # No draft model, or the transcript was reused: the full result is already there
+        return job.result()
+
+    task = asyncio.create_task(finish_refinement(job_id, client_id, job))
+    transcribe_task.refining.add(task)
+    task.add_done_callback(transcribe_task.refining.discard)
+    return draft_ready.result()
+
+async def finish_refinement(job_id: str, client_id: str, job: asyncio.Task):
+    """Push the refined result (or the failure) of a drafted job to its client"""
+    try:
+        result = await job
+        await state.publish(client_id, {"type": "complete", "jobId": job_id, "result": result})
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"Refinement of job {job_id} failed: {str(e)}")
+        await state.publish(client_id, {"type": "error", "jobId": job_id, "message": str(e)})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the journaled state of a job, with its result once done"""
+    job = await asyncio.to_thread(journal.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = {"jobId": job_id, "state": job["state"], "error": job["error"]}
+    if job["state"] == DONE and job["result_path"] and os.path.exists(job["result_path"]):
+        with open(job["result_path"], encoding="utf-8") as f:
+            response["result"] = json.load(f)
+    return response
+
+@app.get("/jobs/{job_id}/export")
+async def export_job(job_id: str, request: Request, format: str = "srt"):
+    """Render a finished job as SRT, WebVTT, segment JSON or Markdown"""
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(FORMATS)}")
+    job = await asyncio.to_thread(journal.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["state"] != DONE or not job["result_path"] or not os.path.exists(job["result_path"]):
+        raise HTTPException(status_code=409, detail=f"Job is {job['state']}, no result to export yet")
+
+    # The ETag is known without rendering, so revalidations cost a stat() only
+    gzipped = accepts_gzip(request.headers.get("accept-encoding", ""))
+    etag = encoded_etag(export_etag(job["result_path"], format), gzipped)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    export = await asyncio.to_thread(render_cache.render, job["result_path"], format)
+    body = export.body
+    if gzipped:
+        body = export.gzipped
+        headers["Content-Encoding"] = "gzip"
+    headers["Content-Length"] = str(len(body))
+    headers["Content-Disposition"] = f'attachment; filename="transcription_{job_id[:8]}.{export.extension}"'
+
+    def chunks(size: int = 64 * 1024):
+        for offset in range(0, len(body), size):
+            yield body[offset:offset + size]
+
+    return StreamingResponse(chunks(), media_type=export.media_type, headers=headers)
+
+async def resume_job(job: Dict):
+    """Run a job recovered from the journal and push its result to the client"""
+    # API keys are not journaled; recovered jobs only summarize with the server key
+    api_key = os.getenv("OPENAI_API_KEY") if job["enable_summary"] else None
+    try:
+        result = await run_job(job["job_id"], job["client_id"], job["audio_path"],
+                               bool(api_key), api_key, job["priority"])
+        await state.publish(job["client_id"], {
+            "type": "complete",
+            "jobId": job["job_id"],
+            "result": result
+        })
+    except Exception as e:
+        logger.error(f"Recovered job {job['job_id']} failed: {str(e)}")
+
+@app.get("/health")
+async def health():
+    """Readiness and startup timings of this replica"""
+    if not startup_report.ready:
+        raise HTTPException(status_code=503, detail=startup_report.as_dict())
+    return startup_report.as_dict()
+
+@app.get("/metrics/summaries")
+async def summary_metrics():
+    """Concurrency limit, retries and latency of summary completions, per API key hash"""
+    return limiter_metrics()
+
+@app.on_event("startup")
+async def validate_and_warm_up():
+    """Validate whisper paths and warm up enabled subsystems once per process"""
+    await asyncio.to_thread(run_startup, VAD_ENABLED, DEDUP_ENABLED)
+
+@app.on_event("startup")
+async def start_state_backend():
+    """Start forwarding events addressed to this process's WebSocket clients"""
+    await state.start(deliver, lambda: list(active_connections))
+
+@app.on_event("startup")
+async def recover_jobs():
+    """Re-queue jobs that were interrupted by a crash or restart"""
+    await asyncio.to_thread(uploads.recover)
+    for job in await asyncio.to_thread(journal.claim_interrupted):
+        file_handler.spool.adopt(job["job_id"], job["audio_path"])
+        logger.info(f"Recovering interrupted job {job['job_id']} for client {job['client_id']}")
+        task = asyncio.create_task(resume_job(job))
+        transcribe_task.recovered.add(task)
+        task.add_done_callback(transcribe_task.recovered.discard)
+
+    # Audio of unfinished jobs is still needed, everything else older than the cutoff is orphaned
+    file_handler.spool.start_janitor(
+        protected=lambda: [job["audio_path"] for job in journal.unfinished()]
+        + [upload["path"] for upload in uploads.open_uploads()],
+        # Abandoned uploads would otherwise hold their spool space until the next restart
+        before_sweep=uploads.expire
+    )
+
+@app.on_event("startup")
+async def drain_on_signal():
+    """Start draining when SIGINT/SIGTERM arrives, not once uvicorn has finished the requests"""
+    if threading.current_thread() is not threading.main_thread():
+        return  # Signal handlers can only be set from the main thread (e.g. not under TestClient)
+    loop = asyncio.get_running_loop()
+    # Uvicorn installs its handlers before it imports the app, so chain to them here
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(begin_drain)
+            previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await shutdown()
+    await state.stop()
 
 @app.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
@@ -318,18 +813,19 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         # Store the new connection
         active_connections[client_id] = websocket
         
-        # Send initial test message with audio duration
+        # Send initial test message with audio duration; the job may run in another worker
+        audio_duration = (await state.get_status(client_id)).get("duration")
         await websocket.send_json({
             "type": "connected",
             "message": "WebSocket connection established",
             "audioInfo": {
-                "duration": getattr(transcribe_task, 'audio_duration', None)
+                "duration": audio_duration
             }
         })
         await websocket.send_json({
             "type": "progress",
             "value": 0,
-            "duration": getattr(transcribe_task, 'audio_duration', None),
+            "duration": audio_duration,
             "timestamp": datetime.datetime.now().isoformat()
         })
         
@@ -362,34 +858,34 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         active_connections.pop(client_id, None)
         logger.info(f"Cleaned up connection for client {client_id}")
 
-async def send_progress(client_id: str, progress: int):
-    """Send progress updates to the client"""
+async def send_progress(client_id: str, progress: int, job_id: Optional[str] = None,
+                        duration: Optional[float] = None):
+    """Send progress updates of one of the client's jobs"""
     logger.debug(f"Attempting to send progress {progress}% to client {client_id}")
     
-    if client_id not in active_connections:
-        logger.warning(f"No active connection found for client {client_id}")
-        return
-        
     try:
-        websocket = active_connections[client_id]
         # Ensure progress is a valid integer between 0 and 100
         normalized_progress = max(0, min(100, int(progress)))
         
         message = {
             "type": "progress",
             "value": normalized_progress,
-            "duration": getattr(transcribe_task, 'audio_duration', None),
+            "duration": duration,
             "timestamp": datetime.datetime.now().isoformat()
         }
         
+        # Attach the scheduler's estimate for this job; a client may run several at once
+        if job_id:
+            message["jobId"] = job_id
+        estimate = scheduler.get_estimate(job_id) if job_id else None
+        if estimate:
+            message["estimatedStart"] = estimate["estimatedStart"]
+            message["estimatedFinish"] = estimate["estimatedFinish"]
+        
         logger.debug(f"Progress update: {normalized_progress}%")
-        # Send progress update without additional keepalive
-        await websocket.send_text(json.dumps(message))
+        # Routed to whichever worker holds the client's WebSocket
+        await state.publish(client_id, message)
         
         logger.info(f"Successfully sent progress {normalized_progress}% to client {client_id}")
-    except WebSocketDisconnect:
-        logger.warning(f"WebSocket disconnected for client {client_id} while sending progress")
-        active_connections.pop(client_id, None)
     except Exception as e:
         logger.error(f"Error sending progress to client {client_id}: {str(e)}")
-        active_connections.pop(client_id, None)
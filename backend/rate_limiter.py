@@ -0,0 +1,220 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger("rate_limiter")
+
+T = TypeVar("T")
+
+# Concurrent completions allowed per API key before any feedback from the provider
+INITIAL_LIMIT = float(os.getenv("STUDYFLOW_SUMMARY_CONCURRENCY", "4"))
+MAX_LIMIT = float(os.getenv("STUDYFLOW_SUMMARY_MAX_CONCURRENCY", "32"))
+MIN_LIMIT = 1.0
+# Multiplicative decrease applied when the provider pushes back
+BACKOFF_RATIO = 0.75
+# Attempts per completion and the total time a completion may take, retries included
+MAX_ATTEMPTS = int(os.getenv("STUDYFLOW_SUMMARY_MAX_ATTEMPTS", "5"))
+DEADLINE = float(os.getenv("STUDYFLOW_SUMMARY_DEADLINE", "120"))
+# Jittered exponential backoff between attempts: uniform(0, min(cap, base * 2^attempt))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+# API keys come from users, so only the most recently used keys keep a limiter
+MAX_LIMITERS = int(os.getenv("STUDYFLOW_SUMMARY_MAX_KEYS", "256"))
+
+# HTTP statuses worth retrying; the first two also mean "slow down"
+OVERLOAD_STATUSES = {429, 503}
+RETRYABLE_STATUSES = OVERLOAD_STATUSES | {408, 409, 500, 502, 504}
+
+
+class DeadlineExceeded(Exception):
+    """The request could not be completed within its deadline"""
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a provider error, if it carries one"""
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait (Retry-After / retry-after-ms headers)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to our own backoff
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # Timeouts and connection failures carry no status (openai raises its own types for them)
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) \
+        or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class LimiterMetrics:
+    """Counters and latency of the completions made with one API key"""
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.overloaded = 0
+        self.deadline_exceeded = 0
+        self.latency_ewma: Optional[float] = None
+
+    def record_latency(self, seconds: float) -> None:
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * seconds
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one API key.
+
+    Every success raises the limit by 1/limit (about +1 per window of
+    completions); a rate-limit or overload response cuts it by a quarter, at most once
+    per window so a burst of 429s from the same window counts once.
+    """
+    def __init__(self, initial: float = INITIAL_LIMIT, min_limit: float = MIN_LIMIT,
+                 max_limit: float = MAX_LIMIT, backoff_ratio: float = BACKOFF_RATIO):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.in_flight = 0
+        self.metrics = LimiterMetrics()
+        self._condition = asyncio.Condition()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the time the slot was granted"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started: float, overloaded: bool = False, succeeded: bool = False) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                # Requests started before the last decrease saw the old limit; ignore their 429s
+                if started >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                    self._last_decrease = time.monotonic()
+                    logger.info(f"Provider pushed back, summary concurrency limit lowered to {self.limit:.1f}")
+            elif succeeded:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    async def run(self, call: Callable[[float], Awaitable[T]], deadline: float = DEADLINE,
+                  max_attempts: int = MAX_ATTEMPTS) -> T:
+        """
+        Run `call(timeout)` under the limit, retrying retryable failures with
+        jittered backoff (or the provider's Retry-After) until the deadline.
+        """
+        expires = time.monotonic() + deadline
+        self.metrics.requests += 1
+        attempt = 0
+        while True:
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self.metrics.deadline_exceeded += 1
+                raise DeadlineExceeded(f"No completion within {deadline:.0f}s")
+
+            try:
+                started = await asyncio.wait_for(self.acquire(), timeout=remaining)
+            except asyncio.TimeoutError:
+                self.metrics.deadline_exceeded += 1
+                raise DeadlineExceeded(f"No free slot within {deadline:.0f}s") from None
+            overloaded = succeeded = False
+            try:
+                remaining = expires - time.monotonic()
+                result = await asyncio.wait_for(call(remaining), timeout=max(remaining, 0.001))
+                succeeded = True
+                self.metrics.successes += 1
+                self.metrics.record_latency(time.monotonic() - started)
+                return result
+            except Exception as e:
+                overloaded = error_status(e) in OVERLOAD_STATUSES
+                self.metrics.overloaded += overloaded
+                attempt += 1
+                if not is_retryable(e) or attempt >= max_attempts:
+                    self.metrics.failures += 1
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+                if time.monotonic() + delay >= expires:
+                    self.metrics.deadline_exceeded += 1
+                    raise DeadlineExceeded(f"Retrying would exceed the {deadline:.0f}s deadline: {str(e)}") from e
+                self.metrics.retries += 1
+                logger.warning(f"Summary completion failed ({str(e)}), retry {attempt} in {delay:.2f}s")
+            finally:
+                await self.release(started, overloaded=overloaded, succeeded=succeeded)
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> Dict:
+        metrics = self.metrics
+        return {
+            "limit": round(self.limit, 2),
+            "inFlight": self.in_flight,
+            "requests": metrics.requests,
+            "successes": metrics.successes,
+            "failures": metrics.failures,
+            "retries": metrics.retries,
+            "overloaded": metrics.overloaded,
+            "deadlineExceeded": metrics.deadline_exceeded,
+            "latencyEwma": round(metrics.latency_ewma, 3) if metrics.latency_ewma is not None else None,
+        }
+
+
+_limiters: "OrderedDict[str, AdaptiveLimiter]" = OrderedDict()
+
+
+def key_id(api_key: str) -> str:
+    """Non-reversible label for an API key, safe to show in metrics"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def get_limiter(api_key: str) -> AdaptiveLimiter:
+    """The limiter shared by every completion made with this API key"""
+    label = key_id(api_key)
+    limiter = _limiters.get(label)
+    if limiter is None:
+        limiter = _limiters[label] = AdaptiveLimiter()
+        _evict_idle()
+    _limiters.move_to_end(label)
+    return limiter
+
+
+def _evict_idle() -> None:
+    """Drop least recently used limiters beyond MAX_LIMITERS; busy ones are kept"""
+    excess = len(_limiters) - MAX_LIMITERS
+    # The newest limiter (last) is the one being handed out
+    for label in list(_limiters)[:-1]:
+        if excess <= 0:
+            break
+        if _limiters[label].in_flight == 0:
+            del _limiters[label]
+            excess -= 1
+
+
+def limiter_metrics() -> Dict[str, Dict]:
+    return {label: limiter.snapshot() for label, limiter in _limiters.items()}
@@ -0,0 +1,198 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("scheduler")
+
+# Number of whisper runs allowed at the same time
+MAX_CONCURRENT_JOBS = int(os.getenv("STUDYFLOW_MAX_CONCURRENT_JOBS", "1"))
+# Seconds of audio credit a queued job earns per second spent waiting
+AGING_RATE = float(os.getenv("STUDYFLOW_AGING_RATE", "2.0"))
+# Seconds of audio credit granted per explicit priority level
+PRIORITY_STEP = float(os.getenv("STUDYFLOW_PRIORITY_STEP", "600"))
+MIN_PRIORITY, MAX_PRIORITY = -5, 5
+# Initial guess of processing seconds per second of audio, refined after each job
+DEFAULT_REALTIME_FACTOR = float(os.getenv("STUDYFLOW_REALTIME_FACTOR", "0.5"))
+
+
+class JobDeferred(Exception):
+    """Raised for jobs that were still queued when the scheduler started draining"""
+
+
+class Job:
+    """A transcription waiting for (or holding) a worker slot"""
+    def __init__(self, job_id: str, client_id: str, duration: float, priority: int,
+                 func: Callable[[], Any], future: asyncio.Future):
+        self.job_id = job_id
+        self.client_id = client_id
+        self.duration = max(0.0, duration or 0.0)
+        self.priority = max(MIN_PRIORITY, min(MAX_PRIORITY, int(priority)))
+        self.func = func
+        self.future = future
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.estimated_start: Optional[float] = None
+        self.estimated_finish: Optional[float] = None
+
+
+class JobScheduler:
+    """
+    Orders transcription jobs by shortest-audio-first, with per-client fair share,
+    explicit priorities and aging so that long jobs are never starved.
+
+    A queued job's rank is its audio duration plus the audio already started for
+    the same client, minus the aging and priority credits. The lowest rank runs next.
+    """
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS,
+                 aging_rate: float = AGING_RATE, priority_step: float = PRIORITY_STEP,
+                 notify: Optional[Callable[[str, Dict], Awaitable[None]]] = None):
+        self.max_concurrent = max(1, max_concurrent)
+        self.aging_rate = aging_rate
+        self.priority_step = priority_step
+        self.notify = notify
+        self.realtime_factor = DEFAULT_REALTIME_FACTOR
+        self.queued: List[Job] = []
+        self.running: Dict[str, Job] = {}
+        # Audio seconds started per client while that client has work in the system
+        self._served: Dict[str, float] = {}
+        self._tasks = set()
+        self.draining = False
+
+    async def submit(self, job_id: str, client_id: str, duration: float,
+                     func: Callable[[], Any], priority: int = 0) -> Any:
+        """Queue a blocking callable and wait for its result"""
+        if self.draining:
+            raise JobDeferred(f"Job {job_id} was not started, the server is shutting down")
+        future = asyncio.get_running_loop().create_future()
+        job = Job(job_id, client_id, duration, priority, func, future)
+        self.queued.append(job)
+        logger.info(f"Queued job {job_id} for client {client_id} "
+                    f"(duration: {job.duration:.1f}s, priority: {job.priority})")
+        await self._dispatch()
+        return await future
+
+    def rank(self, job: Job, now: Optional[float] = None) -> float:
+        """Lower ranks are scheduled first"""
+        now = time.monotonic() if now is None else now
+        waited = now - job.submitted_at
+        return (job.duration
+                + self._served.get(job.client_id, 0.0)
+                - self.aging_rate * waited
+                - self.priority_step * job.priority)
+
+    def _pick_next(self) -> Job:
+        now = time.monotonic()
+        return min(self.queued, key=lambda job: (self.rank(job, now), job.submitted_at))
+
+    async def _dispatch(self) -> None:
+        while not self.draining and self.queued and len(self.running) < self.max_concurrent:
+            job = self._pick_next()
+            self.queued.remove(job)
+            job.started_at = time.monotonic()
+            self.running[job.job_id] = job
+            self._served[job.client_id] = self._served.get(job.client_id, 0.0) + job.duration
+            logger.info(f"Starting job {job.job_id} for client {job.client_id}")
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        await self.publish_estimates()
+
+    async def _run(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(None, job.func)
+            if not job.future.done():
+                job.future.set_result(result)
+            self._record_runtime(job)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            self.running.pop(job.job_id, None)
+            if not self._has_work(job.client_id):
+                self._served.pop(job.client_id, None)
+            await self._dispatch()
+
+    def begin_drain(self) -> None:
+        """Stop starting jobs; queued ones fail with JobDeferred so their callers can answer"""
+        self.draining = True
+        for job in self.queued:
+            if not job.future.done():
+                job.future.set_exception(JobDeferred(f"Job {job.job_id} was not started, "
+                                                     "the server is shutting down"))
+        self.queued.clear()
+
+    async def drain(self) -> None:
+        """Stop starting queued jobs and wait for the running ones; bound it with asyncio.wait_for"""
+        self.begin_drain()
+        while self.running:
+            await asyncio.sleep(0.5)
+
+    def _has_work(self, client_id: str) -> bool:
+        return (any(job.client_id == client_id for job in self.queued)
+                or any(job.client_id == client_id for job in self.running.values()))
+
+    def _record_runtime(self, job: Job) -> None:
+        """Update the realtime factor estimate with an exponential moving average"""
+        if job.started_at is None or job.duration <= 0:
+            return
+        observed = (time.monotonic() - job.started_at) / job.duration
+        self.realtime_factor = 0.7 * self.realtime_factor + 0.3 * observed
+
+    def estimate(self) -> None:
+        """Estimate start and finish times (epoch seconds) for every job"""
+        now_mono = time.monotonic()
+        offset = time.time() - now_mono
+        # Times at which each worker slot becomes free
+        slots = []
+        for job in self.running.values():
+            expected = job.duration * self.realtime_factor
+            finish = max(now_mono, job.started_at + expected)
+            job.estimated_start = job.started_at + offset
+            job.estimated_finish = finish + offset
+            slots.append(finish)
+        slots.extend([now_mono] * (self.max_concurrent - len(slots)))
+        heapq.heapify(slots)
+
+        for job in sorted(self.queued, key=lambda job: (self.rank(job, now_mono), job.submitted_at)):
+            start = heapq.heappop(slots)
+            finish = start + job.duration * self.realtime_factor
+            job.estimated_start = start + offset
+            job.estimated_finish = finish + offset
+            heapq.heappush(slots, finish)
+
+    def get_estimate(self, job_id: str) -> Optional[Dict]:
+        """Return the latest estimate for a job, if it is known"""
+        job = self.running.get(job_id) or next((j for j in self.queued if j.job_id == job_id), None)
+        if job is None:
+            return None
+        self.estimate()
+        return self._estimate_message(job)
+
+    def _estimate_message(self, job: Job) -> Dict:
+        position = 0
+        if job.job_id not in self.running:
+            now = time.monotonic()
+            ordered = sorted(self.queued, key=lambda j: (self.rank(j, now), j.submitted_at))
+            position = ordered.index(job) + 1
+        return {
+            "type": "queue",
+            "jobId": job.job_id,
+            "position": position,
+            "estimatedStart": job.estimated_start,
+            "estimatedFinish": job.estimated_finish,
+        }
+
+    async def publish_estimates(self) -> None:
+        """Push updated estimates to the clients of waiting and running jobs"""
+        if self.notify is None:
+            return
+        self.estimate()
+        for job in list(self.queued) + list(self.running.values()):
+            try:
+                await self.notify(job.client_id, self._estimate_message(job))
+            except Exception as e:
+                logger.error(f"Failed to publish estimate for job {job.job_id}: {str(e)}")
@@ -0,0 +1,205 @@
+import os
+import abc
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("shared_state")
+
+# "sqlite" shares state between uvicorn workers; "local" keeps it in this process and is
+# only correct with a single worker. The worker count cannot be detected reliably
+# (uvicorn --workers does not export it), so the safe backend is the default.
+STATE_BACKEND = os.getenv("STUDYFLOW_STATE_BACKEND", "sqlite")
+STATE_PATH = os.getenv(
+    "STUDYFLOW_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "state.db")
+)
+# How often each worker looks for events addressed to its WebSocket clients
+POLL_INTERVAL = float(os.getenv("STUDYFLOW_STATE_POLL_INTERVAL", "0.05"))
+# Undelivered events older than this are dropped
+EVENT_TTL = 300.0
+
+Deliver = Callable[[str, Dict], Awaitable[None]]
+
+
+class StateBackend(abc.ABC):
+    """
+    Routes per-client events (progress, queue estimates, results) to whichever
+    worker process holds the client's WebSocket, and keeps per-client status
+    (current job, audio duration) visible to every worker.
+    """
+    @abc.abstractmethod
+    async def start(self, deliver: Deliver, local_clients: Callable[[], Iterable[str]]) -> None:
+        """Begin delivering events for the clients connected to this process"""
+
+    async def stop(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def publish(self, client_id: str, message: Dict) -> None:
+        """Send an event to a client, whichever worker holds its WebSocket"""
+
+    @abc.abstractmethod
+    async def set_status(self, client_id: str, status: Optional[Dict]) -> None:
+        """Set (or clear with None) the status shown to a client when it connects"""
+
+    @abc.abstractmethod
+    async def get_status(self, client_id: str) -> Dict:
+        """Status set for a client, or an empty dict"""
+
+
+class LocalStateBackend(StateBackend):
+    """Single-process backend: events go straight to this process's WebSockets"""
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+        self._status: Dict[str, Dict] = {}
+
+    async def start(self, deliver: Deliver, local_clients: Callable[[], Iterable[str]]) -> None:
+        self._deliver = deliver
+
+    async def publish(self, client_id: str, message: Dict) -> None:
+        if self._deliver is not None:
+            await self._deliver(client_id, message)
+
+    async def set_status(self, client_id: str, status: Optional[Dict]) -> None:
+        if status is None:
+            self._status.pop(client_id, None)
+        else:
+            self._status[client_id] = status
+
+    async def get_status(self, client_id: str) -> Dict:
+        return self._status.get(client_id, {})
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Multi-process backend on a shared SQLite database in WAL mode.
+
+    Publishing appends an event row; every worker polls for new rows addressed
+    to the clients whose WebSocket it holds and forwards them. Database calls
+    run in worker threads so a busy database never stalls the event loop.
+    """
+    def __init__(self, db_path: str = STATE_PATH, poll_interval: float = POLL_INTERVAL):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self._last_id = 0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                client_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS events_client ON events (client_id, id);
+            CREATE TABLE IF NOT EXISTS client_status (
+                client_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    async def start(self, deliver: Deliver, local_clients: Callable[[], Iterable[str]]) -> None:
+        # Only events published from now on are of interest to this worker
+        row = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()
+        self._last_id = row[0]
+        self._task = asyncio.create_task(self._poll(deliver, local_clients))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def publish(self, client_id: str, message: Dict) -> None:
+        await asyncio.to_thread(self._insert_event, client_id, json.dumps(message))
+
+    def _insert_event(self, client_id: str, payload: str) -> None:
+        self._connect().execute(
+            "INSERT INTO events (client_id, payload, created_at) VALUES (?, ?, ?)",
+            (client_id, payload, time.time())
+        )
+
+    def fetch(self, client_ids: List[str]) -> List[Tuple[int, str, str]]:
+        """New events for the given clients, advancing this worker's cursor"""
+        conn = self._connect()
+        last_id = self._last_id
+        # Fix the upper bound first so events published meanwhile are not skipped
+        newest = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        rows = []
+        if client_ids and newest > last_id:
+            placeholders = ", ".join("?" for _ in client_ids)
+            rows = conn.execute(
+                f"SELECT id, client_id, payload FROM events WHERE id > ? AND id <= ? "
+                f"AND client_id IN ({placeholders}) ORDER BY id", (last_id, newest, *client_ids)
+            ).fetchall()
+        # Events for clients connected to other workers are skipped past
+        self._last_id = newest
+        return rows
+
+    def prune(self) -> None:
+        self._connect().execute("DELETE FROM events WHERE created_at < ?", (time.time() - EVENT_TTL,))
+
+    async def _poll(self, deliver: Deliver, local_clients: Callable[[], Iterable[str]]) -> None:
+        last_prune = time.monotonic()
+        while True:
+            try:
+                rows = await asyncio.to_thread(self.fetch, list(local_clients()))
+                for _, client_id, payload in rows:
+                    await deliver(client_id, json.loads(payload))
+                if time.monotonic() - last_prune > 60:
+                    await asyncio.to_thread(self.prune)
+                    last_prune = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to poll shared events: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def set_status(self, client_id: str, status: Optional[Dict]) -> None:
+        await asyncio.to_thread(self._write_status, client_id, status)
+
+    def _write_status(self, client_id: str, status: Optional[Dict]) -> None:
+        conn = self._connect()
+        if status is None:
+            conn.execute("DELETE FROM client_status WHERE client_id = ?", (client_id,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO client_status (client_id, payload, updated_at) VALUES (?, ?, ?)",
+                (client_id, json.dumps(status), time.time())
+            )
+
+    async def get_status(self, client_id: str) -> Dict:
+        return await asyncio.to_thread(self._read_status, client_id)
+
+    def _read_status(self, client_id: str) -> Dict:
+        row = self._connect().execute(
+            "SELECT payload FROM client_status WHERE client_id = ?", (client_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+
+def create_state_backend(name: str = STATE_BACKEND) -> StateBackend:
+    if name == "local":
+        backend = LocalStateBackend()
+    elif name == "sqlite":
+        backend = SQLiteStateBackend()
+    else:
+        raise ValueError(f"Unknown state backend: {name}")
+    logger.info(f"Using the {name} state backend (set STUDYFLOW_STATE_BACKEND to change it)")
+    return backend
@@ -0,0 +1,296 @@
+import os
+import glob
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("spool")
+
+MB = 1024 * 1024
+
+# Large uploads go to a scratch volume, small ones to tmpfs (RAM) when available.
+# Starlette already buffers multipart files over 1 MB in a disk tempfile before /transcribe/
+# runs, so only uploads up to 1 MB (or parts of chunked uploads, which are written straight
+# into the spool) avoid the disk entirely; larger ones are copied from that tempfile.
+SPOOL_DIR = os.getenv("STUDYFLOW_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "studyflow"))
+MEMORY_SPOOL_DIR = os.getenv(
+    "STUDYFLOW_MEMORY_SPOOL_DIR",
+    "/dev/shm/studyflow" if os.path.isdir("/dev/shm") else ""
+)
+MEMORY_THRESHOLD = int(os.getenv("STUDYFLOW_MEMORY_SPOOL_MB", "32")) * MB
+MEMORY_QUOTA = int(os.getenv("STUDYFLOW_MEMORY_QUOTA_MB", "512")) * MB
+JOB_QUOTA = int(os.getenv("STUDYFLOW_JOB_QUOTA_MB", "2048")) * MB
+DISK_QUOTA = int(os.getenv("STUDYFLOW_DISK_QUOTA_MB", "20480")) * MB
+# Janitor: how often it runs and how old an untracked temp_* file must be to be removed
+JANITOR_INTERVAL = float(os.getenv("STUDYFLOW_JANITOR_INTERVAL", "600"))
+ORPHAN_AGE = float(os.getenv("STUDYFLOW_ORPHAN_AGE", "3600"))
+
+CHUNK_SIZE = 1 * MB
+# Decoded audio (16 kHz mono 16-bit PCM) takes this many bytes per second of audio
+DECODED_BYTES_PER_SECOND = 32000
+
+
+class SpoolError(Exception):
+    """Base class for spool admission failures"""
+
+
+class UploadTooLarge(SpoolError):
+    """The upload is larger than the per-job quota"""
+
+
+class SpoolFull(SpoolError):
+    """Accepting the upload would exceed the global quota; retry later"""
+
+
+class Reservation:
+    """Space held by one job in one spool tier"""
+    def __init__(self, job_id: str, path: str, size: int, in_memory: bool):
+        self.job_id = job_id
+        self.path = path
+        self.size = size
+        self.in_memory = in_memory
+        # Bytes reserved on disk for files derived from the upload, by suffix
+        self.derived: Dict[str, int] = {}
+
+
+class SpoolManager:
+    """
+    Owns every temporary audio file of the backend.
+
+    Uploads are admitted against a per-job and a global quota before a single
+    byte is written. Files are named temp_<job_id>.wav so that derivatives
+    written next to them (e.g. whisper's .txt output) share the prefix and are
+    removed together on release. A janitor removes orphaned temp_* files left
+    behind by crashed processes.
+
+    The memory tier keeps whisper's and ffmpeg's reads of small uploads off the
+    disk; it does not avoid the framework's own upload buffering (see above).
+    """
+    def __init__(self, spool_dir: str = SPOOL_DIR, memory_dir: str = MEMORY_SPOOL_DIR,
+                 memory_threshold: int = MEMORY_THRESHOLD, memory_quota: int = MEMORY_QUOTA,
+                 job_quota: int = JOB_QUOTA, disk_quota: int = DISK_QUOTA,
+                 legacy_dirs: Iterable[str] = ()):
+        self.spool_dir = spool_dir
+        self.memory_dir = memory_dir
+        self.memory_threshold = memory_threshold if memory_dir else 0
+        self.memory_quota = memory_quota
+        self.job_quota = job_quota
+        self.disk_quota = disk_quota
+        # Directories where older versions wrote temp files; only swept by the janitor
+        self.legacy_dirs = list(legacy_dirs)
+        self.reservations: Dict[str, Reservation] = {}
+        self._lock = threading.Lock()
+        self._janitor: Optional[asyncio.Task] = None
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        if self.memory_dir:
+            try:
+                os.makedirs(self.memory_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Memory spool unavailable at {self.memory_dir}: {str(e)}")
+                self.memory_dir = ""
+                self.memory_threshold = 0
+
+    def usage(self) -> Dict[str, int]:
+        """Bytes currently reserved in each tier"""
+        with self._lock:
+            return self._usage()
+
+    def _usage(self) -> Dict[str, int]:
+        memory = sum(r.size for r in self.reservations.values() if r.in_memory)
+        disk = sum(r.size for r in self.reservations.values() if not r.in_memory)
+        disk += sum(sum(r.derived.values()) for r in self.reservations.values())
+        return {"memory": memory, "disk": disk}
+
+    def admit(self, job_id: str, size: int, suffix: str = ".wav") -> str:
+        """Reserve space for an upload of `size` bytes and return the path to write it to"""
+        if size > self.job_quota:
+            raise UploadTooLarge(
+                f"Upload of {size // MB} MB exceeds the {self.job_quota // MB} MB per-job limit"
+            )
+        with self._lock:
+            if job_id in self.reservations:
+                return self.reservations[job_id].path
+            usage = self._usage()
+            if size <= self.memory_threshold and usage["memory"] + size <= self.memory_quota:
+                in_memory, directory = True, self.memory_dir
+            elif usage["disk"] + size <= self.disk_quota:
+                in_memory, directory = False, self.spool_dir
+            else:
+                raise SpoolFull("Server is at capacity, please retry shortly")
+            path = os.path.join(directory, f"temp_{job_id}{suffix}")
+            self.reservations[job_id] = Reservation(job_id, path, size, in_memory)
+        logger.info(f"Admitted {size} bytes for job {job_id} "
+                    f"({'memory' if in_memory else 'disk'} spool)")
+        return path
+
+    def adopt(self, job_id: str, path: str) -> None:
+        """Account for a file spooled before a restart"""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        in_memory = bool(self.memory_dir) and os.path.dirname(path) == self.memory_dir
+        with self._lock:
+            self.reservations[job_id] = Reservation(job_id, path, size, in_memory)
+
+    def forget(self, job_id: str) -> None:
+        """Free a reservation without deleting its files, once another process owns them"""
+        with self._lock:
+            self.reservations.pop(job_id, None)
+
+    def spool(self, job_id: str, source: BinaryIO, size: Optional[int] = None) -> str:
+        """Admit and copy an upload into the spool, enforcing the reserved size"""
+        if size is None:
+            size = _stream_size(source)
+        # Unknown sizes are admitted pessimistically at the per-job limit
+        reserved = size if size is not None else self.job_quota
+        path = self.admit(job_id, reserved)
+        written = 0
+        try:
+            with open(path, "wb") as buffer:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if written > reserved:
+                        raise UploadTooLarge(f"Upload exceeds its admitted size of {reserved} bytes")
+                    buffer.write(chunk)
+        except Exception:
+            self.release(job_id)
+            raise
+        with self._lock:
+            # Account for the real size when the hint was wrong
+            self.reservations[job_id].size = written
+        return path
+
+    def path_for(self, job_id: str, suffix: str) -> str:
+        """Path for a file derived from a job's upload, removed with it on release"""
+        with self._lock:
+            reservation = self.reservations.get(job_id)
+        directory = os.path.dirname(reservation.path) if reservation else self.spool_dir
+        return os.path.join(directory, f"temp_{job_id}{suffix}")
+
+    def reserve_derived(self, job_id: str, suffix: str, size: int) -> str:
+        """
+        Reserve disk space for a file derived from a job's upload (e.g. its decoded
+        audio) and return its path. Derived files always go to the disk tier: a few
+        MB of compressed audio can decode to gigabytes of PCM. The upload and its
+        derived files share the per-job quota.
+        """
+        with self._lock:
+            reservation = self.reservations.get(job_id)
+            if reservation is None:
+                raise SpoolError(f"Job {job_id} has no spooled upload")
+            derived = sum(reserved for name, reserved in reservation.derived.items() if name != suffix)
+            job_usage = reservation.size + derived
+            if job_usage + size > self.job_quota:
+                raise UploadTooLarge(f"The {suffix} file of job {job_id} would exceed the "
+                                     f"{self.job_quota // MB} MB per-job limit")
+            usage = self._usage()["disk"] - reservation.derived.get(suffix, 0)
+            if usage + size > self.disk_quota:
+                raise SpoolFull(f"No spool space left for the {suffix} file of job {job_id}")
+            reservation.derived[suffix] = size
+        return os.path.join(self.spool_dir, f"temp_{job_id}{suffix}")
+
+    def release(self, job_id: str) -> None:
+        """Delete a job's spooled files and free its reservation"""
+        with self._lock:
+            reservation = self.reservations.pop(job_id, None)
+        patterns = {os.path.join(glob.escape(self.spool_dir), f"temp_{glob.escape(job_id)}*")}
+        if self.memory_dir:
+            patterns.add(os.path.join(glob.escape(self.memory_dir), f"temp_{glob.escape(job_id)}*"))
+        if reservation:
+            # Adopted files may predate the temp_<job_id> naming
+            patterns.add(glob.escape(reservation.path) + "*")
+        for pattern in patterns:
+            for path in glob.glob(pattern):
+                _remove(path)
+
+    def release_all(self, keep: Optional[Set[str]] = None) -> None:
+        """Release every reservation except the jobs listed in `keep`"""
+        keep = keep or set()
+        with self._lock:
+            job_ids = [job_id for job_id in self.reservations if job_id not in keep]
+        for job_id in job_ids:
+            self.release(job_id)
+
+    def sweep(self, protected: Iterable[str] = ()) -> List[str]:
+        """Remove temp_* files that no live job owns and that are older than ORPHAN_AGE"""
+        protected_paths = set(protected)
+        with self._lock:
+            owned = {r.job_id for r in self.reservations.values()}
+            protected_paths.update(r.path for r in self.reservations.values())
+        cutoff = time.time() - ORPHAN_AGE
+        removed = []
+        directories = [self.spool_dir] + ([self.memory_dir] if self.memory_dir else []) + self.legacy_dirs
+        for directory in directories:
+            for path in glob.glob(os.path.join(glob.escape(directory), "temp_*")):
+                name = os.path.basename(path)
+                if any(name.startswith(f"temp_{job_id}") for job_id in owned):
+                    continue
+                if any(path.startswith(p) for p in protected_paths):
+                    continue
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except OSError:
+                    continue
+                if _remove(path):
+                    removed.append(path)
+        if removed:
+            logger.info(f"Janitor removed {len(removed)} orphaned temp file(s)")
+        return removed
+
+    def start_janitor(self, protected: Callable[[], Iterable[str]] = lambda: (),
+                      before_sweep: Callable[[], object] = lambda: None) -> None:
+        """
+        Run sweep() in the background every JANITOR_INTERVAL seconds, after
+        `before_sweep` (e.g. expiring abandoned uploads so their space is freed)
+        """
+        async def janitor():
+            while True:
+                try:
+                    await asyncio.to_thread(before_sweep)
+                    # protected() may query the journal, so it runs off the event loop too
+                    await asyncio.to_thread(lambda: self.sweep(protected()))
+                except Exception as e:
+                    logger.error(f"Janitor sweep failed: {str(e)}")
+                await asyncio.sleep(JANITOR_INTERVAL)
+
+        if self._janitor is None:
+            self._janitor = asyncio.create_task(janitor())
+
+    def stop_janitor(self) -> None:
+        if self._janitor is not None:
+            self._janitor.cancel()
+            self._janitor = None
+
+
+def _stream_size(source: BinaryIO) -> Optional[int]:
+    """Size of a seekable upload stream without reading it"""
+    try:
+        position = source.tell()
+        source.seek(0, os.SEEK_END)
+        size = source.tell() - position
+        source.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def _remove(path: str) -> bool:
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+        logger.info(f"Temporary file removed: {path}")
+        return True
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.warning(f"Failed to remove temporary file {path}: {str(e)}")
+        return False
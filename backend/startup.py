@@ -0,0 +1,78 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, List
+
+from audio_processor import resolve_whisper_paths, warm_up_whisper
+
+logger = logging.getLogger("startup")
+
+# Skip warming optional subsystems (whisper page cache, summaries, VAD) at startup
+WARMUP_ENABLED = os.getenv("STUDYFLOW_WARMUP", "1") not in ("0", "false", "False")
+
+
+class StartupReport:
+    """Timings and readiness of the one-time startup validation and warm-up"""
+    def __init__(self):
+        self.ready = False
+        self.stages: Dict[str, float] = {}
+        self.errors: List[str] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a startup stage; failures are recorded instead of raised"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors.append(f"{name}: {str(e)}")
+            logger.error(f"Startup stage '{name}' failed: {str(e)}")
+        finally:
+            self.stages[name] = round(time.perf_counter() - started, 4)
+
+    def as_dict(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "stages": self.stages,
+            "errors": self.errors,
+        }
+
+
+report = StartupReport()
+
+
+def run_startup(vad_enabled: bool, dedup_enabled: bool = False,
+                report: StartupReport = report) -> StartupReport:
+    """
+    Validate the runtime once and warm up the subsystems this deployment uses.
+
+    Runs in a worker thread from the app's startup hook so requests never
+    repeat this work. A missing whisper binary or model fails fast: nothing
+    is warmed up and the replica reports itself not ready.
+    """
+    started = time.perf_counter()
+    with report.stage("validate_whisper"):
+        resolve_whisper_paths()
+    validated = not report.errors
+
+    if WARMUP_ENABLED and validated:
+        with report.stage("warm_whisper"):
+            warm_up_whisper()
+        if vad_enabled:
+            with report.stage("warm_vad"):
+                import vad  # noqa: F401
+        if dedup_enabled:
+            with report.stage("warm_fingerprint"):
+                from fingerprint import get_index
+                get_index()
+        if os.getenv("OPENAI_API_KEY"):
+            with report.stage("warm_summarizer"):
+                from summarizer import warm_up
+                warm_up()
+
+    report.ready = validated
+    report.stages["total"] = round(time.perf_counter() - started, 4)
+    logger.info(f"Startup finished in {report.stages['total']:.2f}s "
+                f"(ready: {report.ready}, stages: {report.stages})")
+    return report
@@ -1,38 +1,106 @@
 import os
-import openai
-from langdetect import detect
+import asyncio
+import logging
+import contextlib
+import concurrent.futures
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from language_id import identify_language, warm_up as warm_up_language_id
+from rate_limiter import MAX_LIMITERS, get_limiter, key_id
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize the OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger("summarizer")
+
+# openai and langdetect are imported on first use so that deployments
+# without summaries never pay for them at startup.
+
+SUMMARY_MODEL = os.getenv("STUDYFLOW_SUMMARY_MODEL", "gpt-3.5-turbo")
+# Taille (en caractères) des sections résumées pendant la transcription
+SECTION_CHARS = int(os.getenv("STUDYFLOW_SUMMARY_SECTION_CHARS", "6000"))
+
+# Clients OpenAI par libellé de clé, du moins au plus récemment utilisé, et leurs requêtes en cours
+_clients: "OrderedDict[str, Any]" = OrderedDict()
+_client_users: Dict[str, int] = {}
+
+@contextlib.asynccontextmanager
+async def get_client(api_key: str):
+    """
+    Prête le client OpenAI asynchrone de cette clé, qui garde ses connexions entre
+    les requêtes. Comme les limiteurs, seuls MAX_LIMITERS clients sont conservés ;
+    les plus anciens inutilisés sont fermés. Les nouvelles tentatives sont gérées
+    par le limiteur, pas par le client.
+    """
+    label = key_id(api_key)
+    client = _clients.get(label)
+    if client is None or client.api_key != api_key:
+        import openai
+        client = _clients[label] = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+    _clients.move_to_end(label)
+    _client_users[label] = _client_users.get(label, 0) + 1
+    try:
+        yield client
+    finally:
+        _client_users[label] -= 1
+        if not _client_users[label]:
+            del _client_users[label]
+        await _close_idle_clients()
+
+async def _close_idle_clients() -> None:
+    """Ferme les clients les moins récemment utilisés au-delà de MAX_LIMITERS, sauf ceux en cours d'usage"""
+    excess = len(_clients) - MAX_LIMITERS
+    for label in list(_clients):
+        if excess <= 0:
+            break
+        if label not in _client_users:
+            await _clients.pop(label).close()
+            excess -= 1
+
+async def complete(api_key: str, messages: List[Dict], max_tokens: int) -> str:
+    """
+    Envoie une requête de complétion sous le limiteur adaptatif de la clé
+    (concurrence AIMD, nouvelles tentatives avec backoff, délai global).
+    """
+    async with get_client(api_key) as client:
+        response = await get_limiter(api_key).run(
+            lambda timeout: client.chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=0.5,
+                timeout=timeout
+            )
+        )
+    return response.choices[0].message.content.strip()
+
+def warm_up() -> None:
+    """
+    Importe openai et langdetect à l'avance (appelé au démarrage si les résumés sont configurés).
+    """
+    import openai  # noqa: F401
+    warm_up_language_id()
 
 def detect_language(text: str) -> str:
     """
     Détecte la langue du texte (renvoie un code ISO, ex: 'en', 'fr', etc.)
+    à partir d'un échantillon borné du texte, avec cache.
     """
-    try:
-        return detect(text)
-    except:
-        return "en"  # fallback
+    return identify_language(text)
 
-async def generate_bullet_summary(transcript: str, api_key: str = None) -> str:
+async def generate_bullet_summary(transcript: str, api_key: str = None, lang_code: Optional[str] = None) -> str:
     """
     Génère un petit résumé (en puces) à partir du transcript,
-    en respectant la langue détectée du texte.
+    en respectant la langue détectée du texte (ou `lang_code` si elle est déjà connue).
     """
     openai_api_key = api_key or os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         raise Exception("Clé API OpenAI non définie dans les variables d'environnement.")
         
-    # Update the client's API key
-    global client
-    client = openai.OpenAI(api_key=openai_api_key)
-    
-    # Détecter la langue
-    lang_code = detect_language(transcript)
+    # Détecter la langue seulement si elle n'est pas déjà connue
+    lang_code = identify_language(transcript, hint=lang_code)
     
     prompt = (
         "You are an assistant specialized in transcription and factual summarization.\n"
@@ -50,41 +118,31 @@ async def generate_bullet_summary(transcript: str, api_key: str = None) -> str:
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an assistant specialized in transcription and factual summarization. "
-                        "Always respond in the same language as the text provided."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=200,
-            temperature=0.5
-        )
-        bullet_summary = response.choices[0].message.content.strip()
+        bullet_summary = await complete(openai_api_key, [
+            {
+                "role": "system",
+                "content": (
+                    "You are an assistant specialized in transcription and factual summarization. "
+                    "Always respond in the same language as the text provided."
+                )
+            },
+            {"role": "user", "content": prompt}
+        ], max_tokens=200)
         return bullet_summary
     except Exception as e:
         raise Exception(f"Échec du résumé en puces : {str(e)}")
 
-async def generate_detailed_summary(transcript: str, api_key: str = None) -> str:
+async def generate_detailed_summary(transcript: str, api_key: str = None, lang_code: Optional[str] = None) -> str:
     """
     Génère un gros résumé détaillé (en paragraphes) à partir du transcript,
-    en respectant la langue détectée du texte.
+    en respectant la langue détectée du texte (ou `lang_code` si elle est déjà connue).
     """
     openai_api_key = api_key or os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         raise Exception("Clé API OpenAI non définie dans les variables d'environnement.")
         
-    # Update the client's API key
-    global client
-    client = openai.OpenAI(api_key=openai_api_key)
-    
-    # Détecter la langue
-    lang_code = detect_language(transcript)
+    # Détecter la langue seulement si elle n'est pas déjà connue
+    lang_code = identify_language(transcript, hint=lang_code)
 
     prompt = (
         "You are an assistant specialized in transcription and factual summarization.\n"
@@ -99,22 +157,84 @@ async def generate_detailed_summary(transcript: str, api_key: str = None) -> str
     )
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an assistant specialized in factual summarization. "
-                        "Always respond in the same language as the text provided."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=300,
-            temperature=0.5
-        )
-        detailed_summary = response.choices[0].message.content.strip()
+        detailed_summary = await complete(openai_api_key, [
+            {
+                "role": "system",
+                "content": (
+                    "You are an assistant specialized in factual summarization. "
+                    "Always respond in the same language as the text provided."
+                )
+            },
+            {"role": "user", "content": prompt}
+        ], max_tokens=300)
         return detailed_summary
     except Exception as e:
         raise Exception(f"Échec du résumé détaillé : {str(e)}")
+
+class SectionSummarizer:
+    """
+    Résume le transcript section par section pendant que whisper décode encore,
+    puis fusionne les résumés de sections en une passe finale courte.
+
+    `add` est appelé depuis le thread de transcription ; les résumés de
+    sections tournent sur la boucle asyncio `loop`.
+    """
+    def __init__(self, api_key: str, loop: asyncio.AbstractEventLoop,
+                 language: Callable[[], Optional[str]] = lambda: None, section_chars: int = SECTION_CHARS):
+        self.api_key = api_key
+        self.loop = loop
+        self.language = language
+        self.section_chars = section_chars
+        # Langue résolue une seule fois, puis réutilisée pour toutes les sections
+        self.lang_code: Optional[str] = None
+        self._buffer: List[str] = []
+        self._size = 0
+        self._sections: List[concurrent.futures.Future] = []
+
+    def add(self, text: str) -> None:
+        """Ajoute le texte d'un segment ; lance le résumé de la section dès qu'elle est complète."""
+        self._buffer.append(text)
+        self._size += len(text) + 1
+        if self._size >= self.section_chars:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        section = "\n".join(self._buffer)
+        self._buffer = []
+        self._size = 0
+        self._sections.append(asyncio.run_coroutine_threadsafe(
+            generate_detailed_summary(section, self.api_key, self._resolve_language(section)), self.loop
+        ))
+        logger.info(f"Section {len(self._sections)} ({len(section)} caractères) envoyée au résumé")
+
+    def _resolve_language(self, section: str) -> str:
+        """Langue de whisper si elle est connue, sinon détectée sur la première section."""
+        if self.lang_code is None:
+            self.lang_code = self.language() or identify_language(section)
+        return self.lang_code
+
+    async def finish(self, transcript: str, lang_code: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Renvoie (résumé en puces, résumé détaillé). Les résumés de sections sont
+        fusionnés ; un transcript tenant dans une seule section est résumé directement.
+        """
+        source = transcript
+        if self._sections:
+            try:
+                notes = await asyncio.gather(*(asyncio.wrap_future(section) for section in self._sections))
+                # The unfinished last section is shorter than a section: merged as is, not summarized first
+                source = "\n\n".join(notes + ["\n".join(self._buffer)] if self._buffer else notes)
+            except Exception as e:
+                logger.warning(f"Échec d'un résumé de section, résumé du texte entier : {str(e)}")
+        bullet_summary, detailed_summary = await asyncio.gather(
+            generate_bullet_summary(source, self.api_key, lang_code),
+            generate_detailed_summary(source, self.api_key, lang_code)
+        )
+        return bullet_summary, detailed_summary
+
+    def cancel(self) -> None:
+        """Annule les résumés de sections encore en cours (tâche interrompue ou en échec)."""
+        for section in self._sections:
+            section.cancel()
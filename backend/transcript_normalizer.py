@@ -0,0 +1,126 @@
+import re
+import logging
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger("transcript_normalizer")
+
+# A whisper-cli output line: "[00:00:01.000 --> 00:00:04.500]   text"
+SEGMENT_PATTERN = re.compile(r"\s*\[(\d{2}:\d{2}:\d{2}\.\d{3}) --> (\d{2}:\d{2}:\d{2}\.\d{3})\](.*)")
+# Non-speech markers such as *music* or *applause*
+MARKER_PATTERN = re.compile(r"\*[^*]*\*")
+
+
+def format_timestamp(seconds: float) -> str:
+    """Format seconds as HH:MM:SS.mmm like whisper-cli"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def parse_timestamp(value: str) -> float:
+    """Parse HH:MM:SS.mmm into seconds"""
+    return int(value[0:2]) * 3600 + int(value[3:5]) * 60 + int(value[6:8]) + int(value[9:12]) / 1000
+
+
+class Segment:
+    """One timed piece of transcript"""
+    __slots__ = ("start", "end", "text", "label")
+
+    def __init__(self, start: float, end: float, text: str, label: Optional[str] = None):
+        self.start = start
+        self.end = end
+        self.text = text
+        # Whisper's own "[start --> end]" label, reused when the times were not remapped
+        self.label = label
+
+    def timestamped(self) -> str:
+        label = self.label or f"[{format_timestamp(self.start)} --> {format_timestamp(self.end)}]"
+        return f"{label}   {self.text}"
+
+    def to_dict(self) -> Dict:
+        return {"start": round(self.start, 3), "end": round(self.end, 3), "text": self.text}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Segment":
+        return cls(float(data["start"]), float(data["end"]), data["text"])
+
+
+class TranscriptNormalizer:
+    """
+    Turns whisper output into segments, timestamped text and plain text in one pass.
+
+    Lines are fed as whisper prints them; each is parsed once with precompiled
+    patterns, non-speech markers are dropped and, when an offset map is given,
+    timestamps are moved back onto the original recording. The joined texts
+    are built once, on first access after the last line.
+    """
+    def __init__(self, offset_map=None):
+        self.offset_map = offset_map
+        self.segments: List[Segment] = []
+        self._timestamped: Optional[str] = None
+        self._plain: Optional[str] = None
+
+    def feed(self, line: str) -> Optional[Segment]:
+        """Parse one output line; returns the segment it produced, if any"""
+        match = SEGMENT_PATTERN.match(line)
+        label = None
+        if match:
+            start_label, end_label, text = match.groups()
+            start = parse_timestamp(start_label)
+            end = parse_timestamp(end_label)
+            text = text.strip()
+        else:
+            # Untimed text continues the previous segment's timing
+            text = line.strip()
+            start = end = self.segments[-1].end if self.segments else 0.0
+
+        if "*" in text:
+            text = " ".join(MARKER_PATTERN.sub(" ", text).split())
+        if not text:
+            return None
+
+        if match:
+            if self.offset_map is not None:
+                start = self.offset_map.to_original(start)
+                end = self.offset_map.to_original(end, is_end=True)
+            else:
+                label = f"[{start_label} --> {end_label}]"
+
+        segment = Segment(start, end, text, label)
+        self.segments.append(segment)
+        self._timestamped = self._plain = None
+        return segment
+
+    def extend(self, segments: Iterable[Segment]) -> None:
+        """Add segments that did not come from whisper output (e.g. a reused transcript)"""
+        self.segments.extend(segments)
+        self._timestamped = self._plain = None
+
+    def feed_many(self, lines: Iterable[str]) -> "TranscriptNormalizer":
+        for line in lines:
+            self.feed(line)
+        return self
+
+    @property
+    def timestamped_text(self) -> str:
+        if self._timestamped is None:
+            self._timestamped = "\n".join(segment.timestamped() for segment in self.segments)
+        return self._timestamped
+
+    @property
+    def plain_text(self) -> str:
+        if self._plain is None:
+            self._plain = "\n".join(segment.text for segment in self.segments)
+        return self._plain
+
+    def segment_dicts(self) -> List[Dict]:
+        return [segment.to_dict() for segment in self.segments]
+
+
+def normalize_transcript(transcript: str, offset_map=None) -> TranscriptNormalizer:
+    """Normalize an already complete transcript"""
+    if not transcript:
+        return TranscriptNormalizer(offset_map)
+    return TranscriptNormalizer(offset_map).feed_many(transcript.splitlines())
@@ -0,0 +1,217 @@
+import os
+import re
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Set, Tuple
+
+from job_journal import JobJournal
+from spool import MB, SpoolManager
+
+logger = logging.getLogger("uploads")
+
+# Part size offered to clients; they may ask for another one within the bounds
+PART_SIZE = int(os.getenv("STUDYFLOW_UPLOAD_PART_MB", "8")) * MB
+MIN_PART_SIZE = 1 * MB
+MAX_PART_SIZE = 64 * MB
+# Unfinished uploads that received no part for this long are dropped (by the spool janitor)
+UPLOAD_TTL = float(os.getenv("STUDYFLOW_UPLOAD_TTL_HOURS", "6")) * 3600
+
+SUFFIX_PATTERN = re.compile(r"^\.[a-z0-9]{1,8}$")
+
+
+class UploadError(Exception):
+    """Base class for chunked upload failures"""
+
+
+class UploadNotFound(UploadError):
+    """No upload with this id (never initiated, expired or already consumed)"""
+
+
+class PartRejected(UploadError):
+    """A part does not fit the upload or does not match its checksum"""
+
+
+class UploadIncomplete(UploadError):
+    """Completion was requested before every part was acknowledged"""
+
+
+class UploadAlreadyCompleted(UploadError):
+    """Another request already completed this upload and started its job"""
+
+
+def part_count(size: int, part_size: int) -> int:
+    return max(1, -(-size // part_size))
+
+
+class UploadManager:
+    """
+    Resumable chunked uploads written in place into the spool.
+
+    Initiating an upload admits its full size against the spool quotas and
+    preallocates the file. Each part is checked against its SHA-256 and written
+    at its own offset with pwrite, so parts can arrive in any order and in
+    parallel and the completed file needs no assembly copy. Acknowledged parts
+    are recorded in the job journal, so a client can resume after a network
+    failure or a server restart.
+
+    Spool reservations are per process while the journal is shared, so with
+    several workers the parts and the completion may reach other workers than
+    the one that initiated the upload. The completing worker takes the file
+    over, and the others free their reservation once the upload is closed.
+    """
+    def __init__(self, journal: JobJournal, spool: SpoolManager, part_size: int = PART_SIZE):
+        self.journal = journal
+        self.spool = spool
+        self.part_size = part_size
+        # Open uploads whose spool reservation is held by this process
+        self._reserved: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def initiate(self, client_id: str, filename: str, size: int, part_size: int = 0) -> Dict:
+        if size <= 0:
+            raise PartRejected("Upload size must be positive")
+        part_size = min(max(part_size or self.part_size, MIN_PART_SIZE), MAX_PART_SIZE)
+        suffix = os.path.splitext(filename)[1].lower()
+        upload_id = str(uuid.uuid4())
+        path = self.spool.admit(upload_id, size, suffix if SUFFIX_PATTERN.match(suffix) else ".wav")
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o600)
+            try:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(fd, 0, size)
+                else:
+                    os.ftruncate(fd, size)
+            finally:
+                os.close(fd)
+            self.journal.add_upload(upload_id, client_id, path, size, part_size)
+        except Exception:
+            self.spool.release(upload_id)
+            raise
+        self._reserved.add(upload_id)
+        logger.info(f"Initiated upload {upload_id} of {size} bytes in "
+                    f"{part_count(size, part_size)} parts for client {client_id}")
+        return self.status(upload_id)
+
+    def _get(self, upload_id: str) -> Dict:
+        upload = self.journal.get_upload(upload_id)
+        if upload is None:
+            raise UploadNotFound(f"Upload {upload_id} not found")
+        return upload
+
+    def status(self, upload_id: str) -> Dict:
+        """What the client needs to resume: part layout and acknowledged parts"""
+        upload = self._get(upload_id)
+        return {
+            "uploadId": upload_id,
+            "size": upload["size"],
+            "partSize": upload["part_size"],
+            "parts": part_count(upload["size"], upload["part_size"]),
+            "received": upload["parts"],
+            "completed": bool(upload["completed"]),
+        }
+
+    def part_range(self, upload: Dict, part_number: int) -> Tuple[int, int]:
+        """(offset, length) of a part in the file"""
+        if not 0 <= part_number < part_count(upload["size"], upload["part_size"]):
+            raise PartRejected(f"Part {part_number} is out of range")
+        offset = part_number * upload["part_size"]
+        return offset, min(upload["part_size"], upload["size"] - offset)
+
+    def write_part(self, upload_id: str, part_number: int, data: bytes, checksum: str) -> Dict:
+        """Verify a part and write it at its offset; re-sending a part is harmless"""
+        upload = self._get(upload_id)
+        if upload["completed"]:
+            raise PartRejected(f"Upload {upload_id} is already complete")
+        offset, length = self.part_range(upload, part_number)
+        if len(data) != length:
+            raise PartRejected(f"Part {part_number} should be {length} bytes, got {len(data)}")
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != checksum.strip().lower():
+            raise PartRejected(f"Checksum mismatch for part {part_number}")
+
+        fd = os.open(upload["path"], os.O_WRONLY)
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                view = view[written:]
+                offset += written
+            # The part is only acknowledged once it is on disk
+            if hasattr(os, "fdatasync"):
+                os.fdatasync(fd)
+            else:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.journal.ack_part(upload_id, part_number, digest)
+        return {"uploadId": upload_id, "part": part_number, "sha256": digest}
+
+    def complete(self, upload_id: str) -> Dict:
+        """
+        Close an upload whose parts all arrived; returns it with its spooled path.
+        Only one request can complete an upload, the others get UploadAlreadyCompleted.
+        """
+        upload = self._get(upload_id)
+        missing = part_count(upload["size"], upload["part_size"]) - len(upload["parts"])
+        if missing:
+            raise UploadIncomplete(f"{missing} parts of upload {upload_id} have not been received")
+        with self._lock:
+            if not self.journal.complete_upload(upload_id):
+                raise UploadAlreadyCompleted(f"Upload {upload_id} was already completed")
+            # The file now belongs to the job run here, initiated here or not
+            if upload_id not in self.spool.reservations:
+                self.spool.adopt(upload_id, upload["path"])
+            self._reserved.discard(upload_id)
+        logger.info(f"Upload {upload_id} complete ({upload['size']} bytes)")
+        return upload
+
+    def reopen(self, upload_id: str) -> None:
+        """Let a completed upload be completed again when its job could not be journaled"""
+        with self._lock:
+            self.journal.reopen_upload(upload_id)
+            self._reserved.add(upload_id)
+        logger.info(f"Upload {upload_id} reopened")
+
+    def open_uploads(self) -> List[Dict]:
+        return self.journal.open_uploads()
+
+    def expire(self, ttl: float = UPLOAD_TTL) -> List[str]:
+        """
+        Drop open uploads that received no part within `ttl` seconds and free their
+        space. Reservations held here for uploads that another worker completed or
+        expired are freed too, leaving the files to that worker.
+        """
+        reserved = set(self._reserved)
+        cutoff = time.time() - ttl
+        expired = []
+        open_ids = set()
+        for upload in self.journal.open_uploads():
+            if upload["updated_at"] < cutoff or not os.path.exists(upload["path"]):
+                self._drop(upload)
+                expired.append(upload["upload_id"])
+            else:
+                open_ids.add(upload["upload_id"])
+        with self._lock:
+            for upload_id in reserved - open_ids - set(expired):
+                # Still ours unless it was completed here meanwhile
+                if upload_id in self._reserved:
+                    self.spool.forget(upload_id)
+                    self._reserved.discard(upload_id)
+        return expired
+
+    def _drop(self, upload: Dict) -> None:
+        logger.info(f"Dropping stale upload {upload['upload_id']}")
+        self.journal.remove_upload(upload["upload_id"])
+        self.spool.release(upload["upload_id"])
+        self._reserved.discard(upload["upload_id"])
+
+    def recover(self) -> None:
+        """Re-account unfinished uploads after a restart and drop the stale ones"""
+        for upload in self.journal.open_uploads():
+            # The reservation was lost with the previous process; release() needs it back
+            self.spool.adopt(upload["upload_id"], upload["path"])
+            self._reserved.add(upload["upload_id"])
+        self.expire()
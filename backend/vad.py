@@ -0,0 +1,187 @@
+import os
+import wave
+import bisect
+import logging
+import subprocess
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("vad")
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480  # 30 ms frames
+FRAME_SECONDS = FRAME_SAMPLES / SAMPLE_RATE
+READ_FRAMES = 2000  # Frames decoded per read (60 s of audio)
+
+# Only gaps at least this long are removed; shorter pauses are part of speech
+MIN_SILENCE = float(os.getenv("STUDYFLOW_VAD_MIN_SILENCE", "1.5"))
+# Audio kept on each side of a speech region so words are not clipped
+PADDING = float(os.getenv("STUDYFLOW_VAD_PADDING", "0.3"))
+# A frame is speech when it is this many dB above the recording's noise floor
+MARGIN_DB = float(os.getenv("STUDYFLOW_VAD_MARGIN_DB", "12"))
+# Frames below this level are silence whatever the noise floor
+ABSOLUTE_FLOOR_DB = -60.0
+# Trimming is skipped when it would save less than this share of the audio
+MIN_SAVING = float(os.getenv("STUDYFLOW_VAD_MIN_SAVING", "0.05"))
+
+
+class OffsetMap:
+    """Maps times in the trimmed audio back to the original recording"""
+    def __init__(self, regions: List[Tuple[float, float]]):
+        # Kept (start, end) regions of the original audio, in order
+        self.regions = regions
+        self.trimmed_starts = []
+        position = 0.0
+        for start, end in regions:
+            self.trimmed_starts.append(position)
+            position += end - start
+        self.trimmed_duration = position
+
+    def to_original(self, t: float, is_end: bool = False) -> float:
+        """
+        A time exactly on a cut belongs to the next region, unless it ends a
+        segment (`is_end`): then it maps to the end of the previous region.
+        """
+        if not self.regions:
+            return t
+        find = bisect.bisect_left if is_end else bisect.bisect_right
+        index = max(0, find(self.trimmed_starts, t) - 1)
+        start, end = self.regions[index]
+        return min(end, start + t - self.trimmed_starts[index])
+
+
+class SpeechAudio:
+    """Result of silence trimming for one file"""
+    def __init__(self, path: str, offset_map: Optional[OffsetMap], original_duration: float):
+        self.path = path
+        self.offset_map = offset_map
+        self.original_duration = original_duration
+        self.speech_duration = offset_map.trimmed_duration if offset_map else original_duration
+
+    @property
+    def seconds_saved(self) -> float:
+        return max(0.0, self.original_duration - self.speech_duration)
+
+
+def frame_energies(samples: np.ndarray) -> np.ndarray:
+    """Energy in dBFS of each complete 30 ms frame"""
+    count = len(samples) // FRAME_SAMPLES
+    frames = samples[:count * FRAME_SAMPLES].astype(np.float32).reshape(count, FRAME_SAMPLES) / 32768.0
+    return 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+
+def decode_to_wav(input_path: str, wav_path: str) -> np.ndarray:
+    """
+    Decode any input to 16 kHz mono PCM with ffmpeg, writing it to `wav_path`
+    and returning the per-frame energies computed on the fly.
+    """
+    command = [
+        "ffmpeg", "-v", "error",
+        "-i", input_path,
+        "-ar", str(SAMPLE_RATE), "-ac", "1",
+        "-f", "s16le", "-"
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    energies = []
+    read_size = FRAME_SAMPLES * READ_FRAMES * 2
+    try:
+        with wave.open(wav_path, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(SAMPLE_RATE)
+            while True:
+                chunk = process.stdout.read(read_size)
+                if not chunk:
+                    break
+                out.writeframes(chunk)
+                energies.append(frame_energies(np.frombuffer(chunk[:len(chunk) // 2 * 2], dtype=np.int16)))
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+        return_code = process.wait()
+    if return_code != 0:
+        raise RuntimeError(f"FFmpeg decoding failed: {stderr.strip()}")
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def wav_energies(wav_path: str) -> np.ndarray:
+    """Per-frame energies of an already decoded 16 kHz WAV"""
+    energies = []
+    with wave.open(wav_path, "rb") as source:
+        while True:
+            data = source.readframes(FRAME_SAMPLES * READ_FRAMES)
+            if not data:
+                break
+            energies.append(frame_energies(np.frombuffer(data, dtype=np.int16)))
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def speech_regions(energies: np.ndarray) -> List[Tuple[float, float]]:
+    """Find (start, end) seconds of speech from frame energies"""
+    if len(energies) == 0:
+        return []
+    noise_floor = float(np.percentile(energies, 10))
+    threshold = max(noise_floor + MARGIN_DB, ABSOLUTE_FLOOR_DB)
+    voiced = energies > threshold
+    if not voiced.any():
+        return []
+
+    # Rising and falling edges of voiced runs
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * FRAME_SECONDS
+    ends = np.flatnonzero(edges == -1) * FRAME_SECONDS
+    total = len(energies) * FRAME_SECONDS
+
+    regions: List[Tuple[float, float]] = []
+    for start, end in zip(starts, ends):
+        start = max(0.0, float(start) - PADDING)
+        end = min(total, float(end) + PADDING)
+        if regions and start - regions[-1][1] < MIN_SILENCE:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def write_regions(wav_path: str, output_path: str, regions: List[Tuple[float, float]]) -> None:
+    """Copy the given regions of a 16 kHz WAV into a new WAV"""
+    with wave.open(wav_path, "rb") as source, wave.open(output_path, "wb") as out:
+        out.setparams(source.getparams())
+        for start, end in regions:
+            first = int(start * SAMPLE_RATE)
+            remaining = int(end * SAMPLE_RATE) - first
+            source.setpos(first)
+            while remaining > 0:
+                block = min(remaining, SAMPLE_RATE * 60)
+                data = source.readframes(block)
+                if not data:
+                    break
+                out.writeframes(data)
+                remaining -= block
+
+
+def trim_silence(input_path: str, wav_path: str, speech_path: str, decoded: bool = False) -> SpeechAudio:
+    """
+    Decode the input to 16 kHz WAV and remove long non-speech stretches.
+    With `decoded`, `wav_path` already holds the decoded input and is reused.
+
+    Returns the audio whisper should run on and the map needed to bring its
+    timestamps back onto the original recording. Detection is energy based:
+    it removes silence and quiet breaks, not loud music.
+    """
+    energies = wav_energies(wav_path) if decoded else decode_to_wav(input_path, wav_path)
+    duration = len(energies) * FRAME_SECONDS
+    regions = speech_regions(energies)
+    speech = sum(end - start for start, end in regions)
+
+    if not regions or duration - speech < duration * MIN_SAVING:
+        logger.info(f"Silence trimming skipped for {input_path} ({duration - speech:.1f}s of non-speech)")
+        return SpeechAudio(wav_path, None, duration)
+
+    write_regions(wav_path, speech_path, regions)
+    result = SpeechAudio(speech_path, OffsetMap(regions), duration)
+    logger.info(f"Trimmed {result.seconds_saved:.1f}s of non-speech from {input_path} "
+                f"({len(regions)} speech regions, {speech:.1f}s kept)")
+    return result
@@ -1,16 +1,22 @@
 import { motion } from 'framer-motion';
 import { Progress } from '../ui/progress';
+import type { QueueInfo } from '../../hooks/useWebSocket';
 
 interface TranscriptionProgressProps {
   progress: number;
   audioDuration: number | null;
   estimatedTimeRemaining: number | null;
+  queueInfo?: QueueInfo | null;
 }
 
+const formatClock = (epochSeconds?: number | null) =>
+  epochSeconds ? new Date(epochSeconds * 1000).toLocaleTimeString() : null;
+
 export function TranscriptionProgress({ 
   progress, 
   audioDuration, 
-  estimatedTimeRemaining 
+  estimatedTimeRemaining,
+  queueInfo
 }: TranscriptionProgressProps) {
   return (
     <motion.div
@@ -24,7 +30,17 @@ export function TranscriptionProgress({
           className="h-2 w-full progress-bar" 
         />
         <p className="text-sm text-muted-foreground text-center">
-          {progress === 0 ? "Preparing..." : (
+          {queueInfo && queueInfo.position > 0 ? (
+            <>
+              Waiting in queue (position {queueInfo.position})
+              {formatClock(queueInfo.estimatedStart) && (
+                <span className="text-xs block opacity-75 mt-1">
+                  Estimated start: {formatClock(queueInfo.estimatedStart)}
+                  {formatClock(queueInfo.estimatedFinish) && ` · finish: ${formatClock(queueInfo.estimatedFinish)}`}
+                </span>
+              )}
+            </>
+          ) : progress === 0 ? "Preparing..." : (
             <>
               Transcribing... 
               <span className="font-mono progress-value">{progress}%</span>
@@ -38,6 +54,11 @@ export function TranscriptionProgress({
                   Estimated time remaining: {estimatedTimeRemaining}s
                 </div>
               )}
+              {formatClock(queueInfo?.estimatedFinish) && (
+                <div className="text-xs opacity-75 mt-1">
+                  Estimated finish: {formatClock(queueInfo?.estimatedFinish)}
+                </div>
+              )}
             </>
           )}
         </p>
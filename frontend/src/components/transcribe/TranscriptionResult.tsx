@@ -5,14 +5,18 @@ import { motion } from 'framer-motion'
 interface TranscriptionResultProps {
   transcription: string
   isExpanded: boolean
+  canExportSubtitles?: boolean
+  isDraft?: boolean
   onToggleExpand: () => void
   onCopy: () => void
-  onDownload: (format: 'txt' | 'json' | 'md') => void
+  onDownload: (format: 'txt' | 'json' | 'md' | 'srt' | 'vtt') => void
 }
 
 export function TranscriptionResult({
   transcription,
   isExpanded,
+  canExportSubtitles = false,
+  isDraft = false,
   onToggleExpand,
   onCopy,
   onDownload
@@ -35,7 +39,11 @@ export function TranscriptionResult({
       <Card className="backdrop-blur-sm bg-card/50 border-border/50">
         <CardHeader>
           <CardTitle className="text-xl font-semibold">Transcription</CardTitle>
-          <CardDescription>Full transcript of your audio file</CardDescription>
+          <CardDescription>
+            {isDraft
+              ? 'Fast draft, being replaced by the refined transcript as it is ready'
+              : 'Full transcript of your audio file'}
+          </CardDescription>
         </CardHeader>
         <CardContent>
           <div className="space-y-4">
@@ -82,6 +90,24 @@ export function TranscriptionResult({
               >
                 Download .md
               </Button>
+              {canExportSubtitles && (
+                <>
+                  <Button
+                    variant="outline"
+                    size="sm"
+                    onClick={() => onDownload('srt')}
+                  >
+                    Download .srt
+                  </Button>
+                  <Button
+                    variant="outline"
+                    size="sm"
+                    onClick={() => onDownload('vtt')}
+                  >
+                    Download .vtt
+                  </Button>
+                </>
+              )}
             </div>
           </div>
         </CardContent>
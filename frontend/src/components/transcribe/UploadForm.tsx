@@ -7,18 +7,24 @@ import { Button } from '../ui/button';
 import { Card, CardHeader, CardContent, CardFooter, CardTitle, CardDescription } from '../ui/card';
 import { ApiKeyInput } from './ApiKeyInput';
 import { TranscriptionProgress } from './TranscriptionProgress';
-import { useWebSocket } from '../../hooks/useWebSocket';
+import { useWebSocket, type QueueInfo } from '../../hooks/useWebSocket';
 import { useProgressTracking } from '../../hooks/useProgressTracking';
+import type { Segment } from '../../lib/utils';
+import { CHUNKED_UPLOAD_THRESHOLD, completeUpload, uploadInParts } from '../../lib/chunkedUpload';
 
 interface UploadFormProps {
   onTranscriptionComplete: (data: {
+    jobId?: string;
     transcription: string;
+    segments?: Segment[];
+    isDraft?: boolean;
     petitResume?: string;
     grosResume?: string;
   }) => void;
+  onSegmentRefined?: (segment: Segment) => void;
 }
 
-export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
+export function UploadForm({ onTranscriptionComplete, onSegmentRefined }: UploadFormProps) {
   const [selectedFile, setSelectedFile] = useState<File | null>(null);
   const [loading, setLoading] = useState<boolean>(false);
   const [error, setError] = useState<string>('');
@@ -26,6 +32,10 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
   const [apiKey, setApiKey] = useState<string>('');
   const [showApiInput, setShowApiInput] = useState<boolean>(false);
   const [audioDuration, setAudioDuration] = useState<number | null>(null);
+  const [queueInfo, setQueueInfo] = useState<QueueInfo | null>(null);
+  const [draftMode, setDraftMode] = useState<boolean>(false);
+  // A draft was shown and the full model is still refining it
+  const [refining, setRefining] = useState<boolean>(false);
 
   const { 
     progress, 
@@ -39,15 +49,34 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
     closeWebSocket 
   } = useWebSocket({
     onDurationUpdate: setAudioDuration,
-    onProgress: updateProgress
+    onProgress: updateProgress,
+    onQueueUpdate: setQueueInfo,
+    onSegment: (segment) => onSegmentRefined?.(segment),
+    onComplete: (result) => {
+      onTranscriptionComplete({
+        jobId: result.jobId,
+        transcription: result.transcription,
+        segments: result.segments,
+        petitResume: result.petitResume,
+        grosResume: result.grosResume
+      });
+      setRefining(false);
+      closeWebSocket();
+    },
+    onError: (message) => {
+      setError(message);
+      setRefining(false);
+      closeWebSocket();
+    }
   });
 
   // Clean up when loading state changes
   useEffect(() => {
-    if (!loading) {
+    if (!loading && !refining) {
       resetProgress();
+      setQueueInfo(null);
     }
-  }, [loading]);
+  }, [loading, refining]);
 
   const handleFileChange = (event: React.ChangeEvent<HTMLInputElement>) => {
     if (event.target.files?.[0]) {
@@ -72,23 +101,34 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
     resetProgress();
 
     const clientId = `client_${Date.now()}`;
+    let awaitingRefinement = false;
 
     try {
       // First establish WebSocket connection
       await setupWebSocket(clientId);
       
       const formData = new FormData();
-      formData.append('file', selectedFile);
       formData.append('enable_summary', String(enableSummary));
       formData.append('client_id', clientId);
+      formData.append('draft', String(draftMode));
       if (enableSummary) {
         formData.append('api_key', apiKey);
+        // Summarize sections while the transcription is still running
+        formData.append('pipelined_summary', 'true');
       }
 
-      const response = await fetch('http://localhost:8000/transcribe/', {
-        method: 'POST',
-        body: formData,
-      });
+      let response: Response;
+      if (selectedFile.size > CHUNKED_UPLOAD_THRESHOLD) {
+        // Large recordings go up in resumable parts, so a dropped connection does not restart the upload
+        const uploadId = await uploadInParts(selectedFile, clientId);
+        response = await completeUpload(selectedFile, uploadId, formData);
+      } else {
+        formData.append('file', selectedFile);
+        response = await fetch('http://localhost:8000/transcribe/', {
+          method: 'POST',
+          body: formData,
+        });
+      }
       
       if (!response.ok) {
         throw new Error('Failed to process the audio file.');
@@ -96,11 +136,21 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
 
       const data = await response.json();
       onTranscriptionComplete({
+        jobId: data.jobId,
         transcription: data.transcription,
+        segments: data.segments,
+        isDraft: Boolean(data.draft),
         petitResume: data.petitResume,
         grosResume: data.grosResume
       });
 
+      if (data.draft) {
+        // Keep the WebSocket open: refined segments and the final result arrive on it
+        awaitingRefinement = true;
+        setRefining(true);
+        return;
+      }
+
       // Wait a bit before closing the WebSocket to ensure all progress updates are received
       await new Promise(resolve => setTimeout(resolve, 1000));
     } catch (err) {
@@ -108,7 +158,9 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
       setError(err instanceof Error ? err.message : 'Failed to process the audio file.');
     } finally {
       setLoading(false);
-      closeWebSocket();
+      if (!awaitingRefinement) {
+        closeWebSocket();
+      }
     }
   };
 
@@ -145,6 +197,17 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
             </div>
           </div>
 
+          <div className="flex items-center space-x-2">
+            <Switch
+              id="draft-mode"
+              checked={draftMode}
+              onCheckedChange={(checked: boolean) => setDraftMode(checked)}
+            />
+            <Label htmlFor="draft-mode" className="text-sm">
+              Fast draft first (refined while you read)
+            </Label>
+          </div>
+
           {showApiInput && (
             <ApiKeyInput
               apiKey={apiKey}
@@ -152,11 +215,12 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
             />
           )}
 
-          {loading && (
+          {(loading || refining) && (
             <TranscriptionProgress
               progress={progress}
               audioDuration={audioDuration}
               estimatedTimeRemaining={estimatedTimeRemaining}
+              queueInfo={queueInfo}
             />
           )}
         </div>
@@ -164,7 +228,7 @@ export function UploadForm({ onTranscriptionComplete }: UploadFormProps) {
       <CardFooter>
         <Button 
           onClick={handleUpload} 
-          disabled={loading || !selectedFile}
+          disabled={loading || refining || !selectedFile}
           className="w-full"
         >
           {loading ? (
@@ -1,8 +1,21 @@
 import { useRef, useEffect } from 'react';
+import type { Segment } from '../lib/utils';
+
+export interface QueueInfo {
+  position: number;
+  estimatedStart?: number | null;
+  estimatedFinish?: number | null;
+}
 
 interface WebSocketMessage {
-  type: 'progress' | 'connected' | 'pong';
+  type: 'progress' | 'connected' | 'pong' | 'queue' | 'segment' | 'complete' | 'error';
+  jobId?: string;
+  segment?: Segment;
+  result?: Record<string, any>;
   value?: number;
+  position?: number;
+  estimatedStart?: number | null;
+  estimatedFinish?: number | null;
   audioInfo?: {
     duration?: number;
   };
@@ -13,9 +26,20 @@ interface WebSocketMessage {
 interface WebSocketHookProps {
   onDurationUpdate: (duration: number) => void;
   onProgress: (progress: number) => void;
+  onQueueUpdate?: (queue: QueueInfo) => void;
+  onSegment?: (segment: Segment) => void;
+  onComplete?: (result: Record<string, any>) => void;
+  onError?: (message: string) => void;
 }
 
-export const useWebSocket = ({ onDurationUpdate, onProgress }: WebSocketHookProps) => {
+export const useWebSocket = ({
+  onDurationUpdate,
+  onProgress,
+  onQueueUpdate,
+  onSegment,
+  onComplete,
+  onError
+}: WebSocketHookProps) => {
   const wsRef = useRef<WebSocket | null>(null);
 
   // Cleanup effect for WebSocket
@@ -60,6 +84,25 @@ export const useWebSocket = ({ onDurationUpdate, onProgress }: WebSocketHookProp
           const data = JSON.parse(event.data) as WebSocketMessage;
           console.log('Raw WebSocket message:', event.data);
           
+          if (data.type === 'queue' && onQueueUpdate) {
+            onQueueUpdate({
+              position: data.position ?? 0,
+              estimatedStart: data.estimatedStart,
+              estimatedFinish: data.estimatedFinish
+            });
+          } else if (data.type === 'progress' && data.estimatedFinish && onQueueUpdate) {
+            onQueueUpdate({ position: 0, estimatedFinish: data.estimatedFinish });
+          }
+
+          // Refinement of a drafted transcript
+          if (data.type === 'segment' && data.segment && onSegment) {
+            onSegment(data.segment);
+          } else if (data.type === 'complete' && data.result && onComplete) {
+            onComplete(data.result);
+          } else if (data.type === 'error' && onError) {
+            onError(data.message ?? 'Transcription failed.');
+          }
+
           if (data.type === 'progress' || data.type === 'connected') {
             // Update audio duration if available
             if (data.audioInfo?.duration || data.duration) {
@@ -0,0 +1,119 @@
+const API_URL = 'http://localhost:8000';
+
+// Files above this size are sent in resumable parts instead of one request
+export const CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024;
+const PARALLEL_PARTS = 4;
+const MAX_PART_ATTEMPTS = 5;
+
+interface UploadStatus {
+  uploadId: string;
+  size: number;
+  partSize: number;
+  parts: number;
+  received: number[];
+  completed: boolean;
+}
+
+const storageKey = (file: File) => `upload:${file.name}:${file.size}:${file.lastModified}`;
+
+const sha256Hex = async (data: ArrayBuffer) => {
+  const digest = await crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Resume the upload of the same file started earlier, if the server still has it
+const resumeUpload = async (file: File): Promise<UploadStatus | null> => {
+  const uploadId = localStorage.getItem(storageKey(file));
+  if (!uploadId) return null;
+  const response = await fetch(`${API_URL}/uploads/${uploadId}`);
+  if (!response.ok) {
+    localStorage.removeItem(storageKey(file));
+    return null;
+  }
+  const status: UploadStatus = await response.json();
+  return status.completed ? null : status;
+};
+
+const initiateUpload = async (file: File, clientId: string): Promise<UploadStatus> => {
+  const formData = new FormData();
+  formData.append('client_id', clientId);
+  formData.append('filename', file.name);
+  formData.append('size', String(file.size));
+  const response = await fetch(`${API_URL}/uploads`, { method: 'POST', body: formData });
+  if (!response.ok) {
+    throw new Error(response.status === 413 ? 'The audio file is too large.' : 'Failed to start the upload.');
+  }
+  const status: UploadStatus = await response.json();
+  localStorage.setItem(storageKey(file), status.uploadId);
+  return status;
+};
+
+const sendPart = async (file: File, status: UploadStatus, part: number) => {
+  const start = part * status.partSize;
+  const data = await file.slice(start, Math.min(start + status.partSize, file.size)).arrayBuffer();
+  const checksum = await sha256Hex(data);
+
+  for (let attempt = 1; ; attempt++) {
+    let response: Response | null = null;
+    try {
+      response = await fetch(`${API_URL}/uploads/${status.uploadId}/parts/${part}`, {
+        method: 'PUT',
+        headers: { 'X-Checksum-SHA256': checksum },
+        body: data,
+      });
+    } catch {
+      // Network failure: send the part again
+    }
+    if (response?.ok) return;
+    // Only a lost connection, a corrupted transfer or a server error is worth sending again
+    if (response && response.status !== 400 && response.status < 500) {
+      throw new Error(`Upload of part ${part} was refused.`);
+    }
+    if (attempt >= MAX_PART_ATTEMPTS) {
+      throw new Error(`Upload of part ${part} failed.`);
+    }
+    await sleep(Math.random() * Math.min(10000, 500 * 2 ** attempt));
+  }
+};
+
+/**
+ * Upload a file in checksummed parts, several at a time, and return its upload id.
+ * Parts the server already acknowledged (from an interrupted earlier attempt) are skipped.
+ */
+export const uploadInParts = async (
+  file: File,
+  clientId: string,
+  onProgress?: (percent: number) => void
+): Promise<string> => {
+  const status = (await resumeUpload(file)) ?? (await initiateUpload(file, clientId));
+  const received = new Set(status.received);
+  const pending = Array.from({ length: status.parts }, (_, part) => part).filter((part) => !received.has(part));
+  let done = received.size;
+  onProgress?.(Math.round((done / status.parts) * 100));
+
+  const worker = async () => {
+    for (let part = pending.shift(); part !== undefined; part = pending.shift()) {
+      await sendPart(file, status, part);
+      done += 1;
+      onProgress?.(Math.round((done / status.parts) * 100));
+    }
+  };
+  await Promise.all(Array.from({ length: PARALLEL_PARTS }, worker));
+  return status.uploadId;
+};
+
+/** Start the transcription of a finished chunked upload; responds like /transcribe/ */
+export const completeUpload = async (file: File, uploadId: string, formData: FormData) => {
+  const response = await fetch(`${API_URL}/uploads/${uploadId}/complete`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (response.ok) {
+    localStorage.removeItem(storageKey(file));
+  }
+  return response;
+};
@@ -12,3 +12,28 @@ export function formatFileSize(bytes: number): string {
   const i = Math.floor(Math.log(bytes) / Math.log(k))
   return `${parseFloat((bytes / Math.pow(k, i)).toFixed(2))} ${sizes[i]}`
 }
+
+export interface Segment {
+  start: number
+  end: number
+  text: string
+}
+
+// Same layout as whisper-cli: [HH:MM:SS.mmm --> HH:MM:SS.mmm]
+export function formatTimestamp(seconds: number): string {
+  const millis = Math.round(seconds * 1000)
+  const pad = (value: number, size = 2) => String(value).padStart(size, '0')
+  return `${pad(Math.floor(millis / 3600000))}:${pad(Math.floor(millis / 60000) % 60)}:${pad(Math.floor(millis / 1000) % 60)}.${pad(millis % 1000, 3)}`
+}
+
+export function segmentsToText(segments: Segment[]): string {
+  return segments
+    .map(segment => `[${formatTimestamp(segment.start)} --> ${formatTimestamp(segment.end)}]   ${segment.text}`)
+    .join('\n')
+}
+
+// Refined segments replace the draft up to the last refined timestamp
+export function mergeRefinedSegments(draft: Segment[], refined: Segment[]): Segment[] {
+  const refinedUntil = refined.length ? refined[refined.length - 1].end : 0
+  return [...refined, ...draft.filter(segment => segment.start >= refinedUntil)]
+}
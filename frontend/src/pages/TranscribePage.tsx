@@ -4,9 +4,14 @@ import { Button } from '../components/ui/button'
 import { UploadForm } from '../components/transcribe/UploadForm'
 import { TranscriptionResult } from '../components/transcribe/TranscriptionResult'
 import { SummaryResult } from '../components/transcribe/SummaryResult'
+import { mergeRefinedSegments, segmentsToText, type Segment } from '../lib/utils'
 
 interface TranscriptionData {
+  jobId?: string
   transcription: string
+  segments?: Segment[]
+  isDraft?: boolean
+  refinedSegments?: Segment[]
   petitResume?: string
   grosResume?: string
 }
@@ -15,6 +20,19 @@ export function TranscribePage() {
   const [transcriptionData, setTranscriptionData] = useState<TranscriptionData | null>(null)
   const [isTranscriptionExpanded, setIsTranscriptionExpanded] = useState(false)
 
+  // Refined segments from the full model replace the draft as they arrive
+  const handleSegmentRefined = (segment: Segment) => {
+    setTranscriptionData(previous => {
+      if (!previous?.isDraft) return previous
+      const refinedSegments = [...(previous.refinedSegments ?? []), segment]
+      return {
+        ...previous,
+        refinedSegments,
+        transcription: segmentsToText(mergeRefinedSegments(previous.segments ?? [], refinedSegments))
+      }
+    })
+  }
+
   const handleDownload = (content: string, filename: string) => {
     const blob = new Blob([content], { type: 'text/plain' })
     const url = URL.createObjectURL(blob)
@@ -45,6 +63,17 @@ export function TranscribePage() {
     URL.revokeObjectURL(url)
   }
 
+  // Subtitle formats are rendered (and cached) by the backend from the stored segments
+  const handleServerExport = (format: 'srt' | 'vtt') => {
+    if (!transcriptionData?.jobId) return
+    const a = document.createElement('a')
+    a.href = `http://localhost:8000/jobs/${transcriptionData.jobId}/export?format=${format}`
+    a.download = `transcription.${format}`
+    document.body.appendChild(a)
+    a.click()
+    document.body.removeChild(a)
+  }
+
   const handleMarkdownDownload = () => {
     if (!transcriptionData) return
     const mdContent = `# Transcription\n\n${transcriptionData.transcription}\n\n${
@@ -57,12 +86,17 @@ export function TranscribePage() {
 
   return (
     <div id="upload-section" className="container max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-24">
-      <UploadForm onTranscriptionComplete={setTranscriptionData} />
+      <UploadForm
+        onTranscriptionComplete={setTranscriptionData}
+        onSegmentRefined={handleSegmentRefined}
+      />
 
       {transcriptionData?.transcription && (
         <TranscriptionResult
           transcription={transcriptionData.transcription}
           isExpanded={isTranscriptionExpanded}
+          canExportSubtitles={Boolean(transcriptionData.jobId) && !transcriptionData.isDraft}
+          isDraft={transcriptionData.isDraft}
           onToggleExpand={() => setIsTranscriptionExpanded(!isTranscriptionExpanded)}
           onCopy={() => navigator.clipboard.writeText(transcriptionData.transcription)}
           onDownload={(format) => {
@@ -76,6 +110,10 @@ export function TranscribePage() {
               case 'md':
                 handleMarkdownDownload()
                 break
+              case 'srt':
+              case 'vtt':
+                handleServerExport(format)
+                break
             }
           }}
         />
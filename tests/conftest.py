@@ -0,0 +1,12 @@
+"""
+Test setup shared by the whole suite.
+
+backend.main and the modules it loads import each other by bare name, as the
+server runs from backend/, so that directory has to be importable for any test
+that touches them.
+"""
+import os
+import sys
+
+# Backend modules import each other by bare name (the server runs from backend/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
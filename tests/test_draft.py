@@ -0,0 +1,116 @@
+# Unit test for draft transcription and its refinement
+
+import asyncio
+
+import pytest
+
+from backend import main
+from backend.job_journal import JobJournal
+from backend.shared_state import LocalStateBackend
+
+DRAFT_LINES = ["[00:00:00.000 --> 00:00:02.000]   brouillon", "[00:00:02.000 --> 00:00:04.000]   deux"]
+FULL_LINES = ["[00:00:00.000 --> 00:00:04.000]   version finale"]
+
+
+@pytest.fixture
+def app_state(tmp_path, monkeypatch):
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(b"RIFF")
+    monkeypatch.setattr(main, "journal", JobJournal(str(tmp_path / "jobs.db")))
+    monkeypatch.setattr(main, "state", LocalStateBackend())
+    monkeypatch.setattr(main, "RESULTS_FOLDER", str(tmp_path / "results"))
+    monkeypatch.setattr(main, "VAD_ENABLED", False)
+    monkeypatch.setattr(main, "DEDUP_ENABLED", False)
+    monkeypatch.setattr(main, "get_audio_duration", lambda path: 4.0)
+    monkeypatch.setattr(main, "resolve_draft_model", lambda: "base.bin")
+    return str(audio)
+
+
+def _transcriber(calls, draft_fails=False, full_fails=False):
+    """Stand-in for whisper: the draft model answers French, the full model English"""
+    def transcribe(path, progress_callback=None, audio_duration=None, language_callback=None,
+                   line_callback=None, model_path=None, language=None):
+        calls.append({"draft": model_path is not None, "language": language})
+        if model_path is not None:
+            if draft_fails:
+                raise RuntimeError("draft model crashed")
+            language_callback("fr")
+            lines = DRAFT_LINES
+        else:
+            if full_fails:
+                raise RuntimeError("full model crashed")
+            language_callback("en")
+            lines = FULL_LINES
+        for line in lines:
+            line_callback(line)
+        return ""
+    return transcribe
+
+
+def _run(audio_path):
+    async def scenario():
+        messages = []
+
+        async def deliver(client_id, message):
+            messages.append(message)
+
+        await main.state.start(deliver, lambda: ["client"])
+        main.journal.add("job", "client", audio_path)
+        response = await main.run_job_with_draft("job", "client", audio_path)
+        await asyncio.gather(*main.transcribe_task.refining)
+        return response, messages
+
+    return asyncio.run(scenario())
+
+
+def test_draft_then_refined_segments_then_result(app_state, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "transcribe_audio", _transcriber(calls))
+    response, messages = _run(app_state)
+
+    assert response["draft"] is True and response["language"] == "fr"
+    assert [segment["text"] for segment in response["segments"]] == ["brouillon", "deux"]
+    # The full model detects the language itself instead of trusting the draft's guess
+    assert calls == [{"draft": True, "language": None}, {"draft": False, "language": None}]
+
+    types = [message["type"] for message in messages if message["type"] in ("segment", "complete", "error")]
+    assert types == ["segment", "complete"]
+    result = messages[-1]["result"]
+    assert result["language"] == "en" and result["transcription"].endswith("version finale")
+    assert main.journal.get("job")["state"] == "done"
+
+
+def test_failed_draft_falls_back_to_the_full_result(app_state, monkeypatch):
+    calls = []
+    monkeypatch.setattr(main, "transcribe_audio", _transcriber(calls, draft_fails=True))
+    response, messages = _run(app_state)
+
+    # No draft was returned: the request gets the full result and nothing follows on the WebSocket
+    assert "draft" not in response and response["language"] == "en"
+    assert not [message for message in messages if message["type"] in ("segment", "complete", "error")]
+
+
+def test_failed_refinement_is_reported(app_state, monkeypatch):
+    monkeypatch.setattr(main, "transcribe_audio", _transcriber([], full_fails=True))
+    response, messages = _run(app_state)
+
+    assert response["draft"] is True
+    assert messages[-1]["type"] == "error" and "full model crashed" in messages[-1]["message"]
+    assert main.journal.get("job")["state"] == "failed"
+
+
+def test_status_moves_to_the_clients_other_running_job(app_state, monkeypatch):
+    monkeypatch.setattr(main, "transcribe_audio", _transcriber([]))
+
+    async def scenario():
+        # Another job of the same client is still running in this worker
+        main.journal.add("other", "client", app_state, duration=9.0)
+        main.transcribe_task.job_ids["client"] = {"other"}
+        main.journal.add("job", "client", app_state)
+        await main.run_job("job", "client", app_state)
+        return await main.state.get_status("client")
+
+    try:
+        assert asyncio.run(scenario()) == {"jobId": "other", "duration": 9.0}
+    finally:
+        main.transcribe_task.job_ids.pop("client", None)
@@ -0,0 +1,67 @@
+# Unit test for transcript exports
+
+import json
+
+from backend.exporters import (RenderCache, accepts_gzip, encoded_etag, etag_matches, export_etag,
+                               render_markdown, render_srt, render_vtt)
+
+RESULT = {
+    "jobId": "job",
+    "transcription": "[00:00:00.000 --> 00:00:02.500]   Bonjour.\n[00:00:02.500 --> 00:01:05.250]   Au revoir.",
+    "segments": [
+        {"start": 0.0, "end": 2.5, "text": "Bonjour."},
+        {"start": 2.5, "end": 65.25, "text": "Au revoir."},
+    ],
+    "petitResume": "- Salutations",
+}
+
+
+def test_subtitle_formats():
+    assert render_srt(RESULT) == (
+        "1\n00:00:00,000 --> 00:00:02,500\nBonjour.\n\n"
+        "2\n00:00:02,500 --> 00:01:05,250\nAu revoir.\n"
+    )
+    assert render_vtt(RESULT).startswith("WEBVTT\n\n00:00:00.000 --> 00:00:02.500\nBonjour.\n")
+
+
+def test_results_without_segments_still_export():
+    legacy = {"transcription": RESULT["transcription"]}
+    assert render_srt(legacy) == render_srt(RESULT)
+    assert "### Key Points:\n- Salutations" in render_markdown(RESULT)
+
+
+def test_render_cache_reuses_and_invalidates(tmp_path):
+    path = tmp_path / "result.json"
+    path.write_text(json.dumps(RESULT), encoding="utf-8")
+    cache = RenderCache(max_bytes=1024 * 1024)
+
+    first = cache.render(str(path), "srt")
+    assert cache.render(str(path), "srt") is first
+    assert first.etag == export_etag(str(path), "srt")
+
+    RESULT_CHANGED = dict(RESULT, segments=RESULT["segments"][:1])
+    path.write_text(json.dumps(RESULT_CHANGED), encoding="utf-8")
+    assert cache.render(str(path), "srt").etag != first.etag
+
+
+def test_render_cache_is_bounded():
+    from backend.exporters import RenderedExport
+    cache = RenderCache(max_bytes=400)
+    for index in range(10):
+        cache.put(RenderedExport(b"x" * 100, f'"{index}"', "text/plain", "txt"))
+    assert cache.bytes <= 400
+    assert cache.get('"9"') is not None and cache.get('"0"') is None
+
+
+def test_content_negotiation():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, gzip;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0, deflate")
+    assert not accepts_gzip("*;q=0")
+    assert not accepts_gzip("")
+
+    etag = '"abc"'
+    assert encoded_etag(etag, True) == '"abc-gz"' and encoded_etag(etag, False) == etag
+    assert etag_matches('"other", W/"abc"', etag)
+    assert not etag_matches('"abc-gz"', etag)
@@ -0,0 +1,57 @@
+# Unit test for acoustic fingerprint deduplication
+
+import json
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.fingerprint import FingerprintIndex, fingerprint_wav
+
+SAMPLE_RATE = 16000
+
+
+def _write_wav(path, samples):
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+def _lecture(seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(SAMPLE_RATE * seconds) / SAMPLE_RATE
+    signal = rng.normal(0, 0.3, len(t))
+    for _ in range(20):
+        envelope = np.sin(2 * np.pi * rng.uniform(0.1, 4) * t + rng.uniform(0, 6))
+        signal += envelope * np.sin(2 * np.pi * rng.uniform(200, 2500) * t)
+    return signal / np.abs(signal).max() * 0.8
+
+
+def test_reencoded_excerpt_reuses_aligned_transcript(tmp_path):
+    lecture = _lecture(60)
+    _write_wav(tmp_path / "original.wav", lecture)
+    # Quieter, noisier, low-passed copy that starts 10 s into the lecture, off the frame grid
+    excerpt = lecture[10 * SAMPLE_RATE + 100:] * 0.6
+    excerpt += np.random.default_rng(1).normal(0, 0.002, len(excerpt))
+    _write_wav(tmp_path / "excerpt.wav", np.convolve(excerpt, np.ones(3) / 3, "same"))
+    _write_wav(tmp_path / "other.wav", _lecture(30, seed=2))
+
+    result_path = tmp_path / "result.json"
+    result_path.write_text(json.dumps({"segments": [
+        {"start": 2.0, "end": 6.0, "text": "before the excerpt"},
+        {"start": 12.0, "end": 15.5, "text": "inside the excerpt"},
+    ]}))
+    index = FingerprintIndex(str(tmp_path / "fingerprints.db"))
+    index.add("job", str(result_path), fingerprint_wav(str(tmp_path / "original.wav")))
+
+    match = index.lookup(fingerprint_wav(str(tmp_path / "excerpt.wav")))
+    assert match is not None and match.job_id == "job"
+    assert match.offset_seconds == pytest.approx(10.0, abs=0.05)
+    segments = match.aligned_segments(50.0)
+    assert [segment.text for segment in segments] == ["inside the excerpt"]
+    assert segments[0].start == pytest.approx(2.0, abs=0.05)
+
+    assert index.lookup(fingerprint_wav(str(tmp_path / "other.wav"))) is None
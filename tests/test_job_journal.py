@@ -0,0 +1,80 @@
+# Unit test for the job journal
+
+import os
+import subprocess
+import sys
+
+from backend.job_journal import JobJournal, BOOT_TOKEN, DONE, FAILED, QUEUED, RUNNING, MAX_ATTEMPTS
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def _orphan(journal, job_id, audio_path, attempts=1):
+    journal.add(job_id, "client", str(audio_path), duration=12.0)
+    journal.mark_running(job_id)
+    journal._connect().execute(
+        "UPDATE jobs SET owner_pid = ?, owner_token = ?, attempts = ? WHERE job_id = ?",
+        (_dead_pid(), "previous-run", attempts, job_id)
+    )
+
+
+def test_state_transitions(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    journal.add("job", "client", str(tmp_path / "a.wav"), priority=2, enable_summary=True)
+    assert journal.get("job")["state"] == QUEUED
+
+    journal.mark_running("job")
+    assert journal.get("job")["state"] == RUNNING
+    assert journal.get("job")["attempts"] == 1
+
+    journal.mark_done("job", "result.json")
+    job = journal.get("job")
+    assert job["state"] == DONE and job["result_path"] == "result.json"
+    assert journal.unfinished() == []
+
+
+def test_interrupted_jobs_are_reclaimed(tmp_path):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    _orphan(journal, "orphan", audio)
+    # A job owned by this (live) process is left alone
+    journal.add("mine", "client", str(audio))
+
+    claimed = journal.claim_interrupted()
+    assert [job["job_id"] for job in claimed] == ["orphan"]
+    assert journal.get("orphan")["state"] == QUEUED
+    # A second claim finds nothing left to recover
+    assert journal.claim_interrupted() == []
+
+
+def test_jobs_of_a_previous_run_with_the_same_pid_are_reclaimed(tmp_path):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    # A restarted container gets the same PID as the run that was interrupted
+    journal.add("restarted", "client", str(audio))
+    journal._connect().execute(
+        "UPDATE jobs SET owner_pid = ?, owner_token = ? WHERE job_id = ?",
+        (os.getpid(), "previous-run", "restarted")
+    )
+
+    claimed = journal.claim_interrupted()
+    assert [job["job_id"] for job in claimed] == ["restarted"]
+    assert journal.get("restarted")["owner_token"] == BOOT_TOKEN
+
+
+def test_unrecoverable_jobs_fail(tmp_path):
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"RIFF")
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    _orphan(journal, "missing", tmp_path / "gone.wav")
+    _orphan(journal, "poison", audio, attempts=MAX_ATTEMPTS)
+
+    assert journal.claim_interrupted() == []
+    assert journal.get("missing")["state"] == FAILED
+    assert journal.get("poison")["state"] == FAILED
@@ -0,0 +1,23 @@
+# Unit test for language identification
+
+import pytest
+
+from backend.language_id import identify_language, sample_text
+
+
+def test_sample_is_bounded():
+    text = "a" * 10000 + "b" * 10000 + "c" * 10000
+    sample = sample_text(text, sample_chars=300)
+    assert len(sample) <= 302
+    assert sample.startswith("a") and "b" in sample and sample.endswith("c")
+
+
+def test_hint_skips_detection():
+    assert identify_language("Bonjour à tous, on commence le cours.", hint="fr") == "fr"
+
+
+def test_detects_language_of_long_text():
+    pytest.importorskip("langdetect")
+    text = "Bonjour à tous, aujourd'hui nous allons parler de la thermodynamique. " * 2000
+    assert identify_language(text) == "fr"
+    assert identify_language("") == "en"
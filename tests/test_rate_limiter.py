@@ -0,0 +1,89 @@
+# Unit test for the adaptive summary limiter
+
+import asyncio
+
+import pytest
+
+from backend import rate_limiter
+from backend.rate_limiter import AdaptiveLimiter, DeadlineExceeded, get_limiter, key_id
+
+
+class FakeRateLimit(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after_ms):
+        super().__init__("Rate limit reached")
+        self.headers = {"retry-after-ms": str(retry_after_ms)}
+
+
+class FakeProvider:
+    """Accepts `capacity` concurrent completions and answers 429 above that"""
+    def __init__(self, capacity, latency=0.01):
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def complete(self, timeout):
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise FakeRateLimit(retry_after_ms=5)
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency)
+            return "summary"
+        finally:
+            self.in_flight -= 1
+
+
+def test_limit_converges_to_provider_capacity():
+    provider = FakeProvider(capacity=4)
+    limiter = AdaptiveLimiter(initial=16, max_limit=64)
+
+    async def scenario():
+        return await asyncio.gather(*(limiter.run(provider.complete, deadline=10) for _ in range(200)))
+
+    results = asyncio.run(scenario())
+    assert results == ["summary"] * 200
+    assert limiter.metrics.successes == 200 and limiter.metrics.failures == 0
+    assert provider.rejected > 0
+    # Pushed back under the capacity, then probing just above it
+    assert 2 <= limiter.limit <= 8
+
+
+def test_non_retryable_errors_fail_fast():
+    class BadRequest(Exception):
+        status_code = 400
+
+    calls = []
+
+    async def complete(timeout):
+        calls.append(timeout)
+        raise BadRequest("invalid request")
+
+    with pytest.raises(BadRequest):
+        asyncio.run(AdaptiveLimiter().run(complete))
+    assert len(calls) == 1
+
+
+def test_deadline_bounds_slow_completions():
+    limiter = AdaptiveLimiter()
+
+    async def complete(timeout):
+        await asyncio.sleep(10)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(limiter.run(complete, deadline=0.2))
+    assert limiter.metrics.deadline_exceeded == 1
+
+
+def test_limiters_are_bounded_by_recent_use(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", rate_limiter.OrderedDict())
+    monkeypatch.setattr(rate_limiter, "MAX_LIMITERS", 2)
+    busy = get_limiter("busy")
+    busy.in_flight = 1
+    get_limiter("old")
+    get_limiter("new")
+    # The idle least recently used key is dropped, the busy one survives
+    assert list(rate_limiter._limiters) == [key_id("busy"), key_id("new")]
+    assert get_limiter("busy") is busy
@@ -0,0 +1,127 @@
+# Unit test for the transcription scheduler
+
+import asyncio
+import time
+
+import pytest
+
+from backend.scheduler import Job, JobDeferred, JobScheduler
+
+
+def _run_jobs(scheduler, jobs):
+    """Submit (job_id, client_id, duration, priority) tuples while the first one blocks"""
+    order = []
+
+    async def main():
+        gate = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def make(job_id, first):
+            def func():
+                if first:
+                    asyncio.run_coroutine_threadsafe(gate.wait(), loop).result()
+                order.append(job_id)
+                return job_id
+            return func
+
+        tasks = []
+        for index, (job_id, client_id, duration, priority) in enumerate(jobs):
+            tasks.append(asyncio.create_task(
+                scheduler.submit(job_id, client_id, duration, make(job_id, index == 0), priority)
+            ))
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    assert sorted(results) == sorted(job[0] for job in jobs)
+    return order
+
+
+def test_short_jobs_run_first():
+    order = _run_jobs(JobScheduler(max_concurrent=1, aging_rate=0), [
+        ("blocker", "a", 10, 0),
+        ("long", "b", 10800, 0),
+        ("short", "c", 300, 0),
+    ])
+    assert order == ["blocker", "short", "long"]
+
+
+def test_fair_share_between_clients():
+    order = _run_jobs(JobScheduler(max_concurrent=1, aging_rate=0), [
+        ("a1", "a", 300, 0),
+        ("a2", "a", 300, 0),
+        ("a3", "a", 300, 0),
+        ("b1", "b", 400, 0),
+    ])
+    # Client b is served before client a's backlog even though its job is longer
+    assert order.index("b1") < order.index("a2")
+
+
+def test_priority_overrides_duration():
+    order = _run_jobs(JobScheduler(max_concurrent=1, aging_rate=0, priority_step=600), [
+        ("blocker", "a", 10, 0),
+        ("short", "b", 300, 0),
+        ("urgent", "c", 600, 1),
+    ])
+    assert order == ["blocker", "urgent", "short"]
+
+
+def test_aging_lets_long_jobs_through():
+    scheduler = JobScheduler(max_concurrent=1, aging_rate=2.0)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        old = Job("old", "a", 3600, 0, lambda: None, future)
+        old.submitted_at = time.monotonic() - 3600
+        new = Job("new", "b", 300, 0, lambda: None, future)
+        scheduler.queued.extend([old, new])
+        return scheduler._pick_next().job_id
+
+    assert asyncio.run(main()) == "old"
+
+
+def test_estimates_follow_queue_order():
+    scheduler = JobScheduler(max_concurrent=1, aging_rate=0)
+    scheduler.realtime_factor = 1.0
+    long_job = Job("long", "b", 1000, 0, lambda: None, None)
+    short_job = Job("short", "c", 100, 0, lambda: None, None)
+    scheduler.queued.extend([long_job, short_job])
+    scheduler.estimate()
+    assert short_job.estimated_finish <= long_job.estimated_start
+    assert scheduler.get_estimate("long")["position"] == 2
+
+
+def test_drain_is_bounded_by_wait_for():
+    scheduler = JobScheduler(max_concurrent=1)
+    release = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        gate = asyncio.Event()
+
+        def blocking():
+            asyncio.run_coroutine_threadsafe(gate.wait(), loop).result()
+
+        running = asyncio.create_task(scheduler.submit("running", "a", 10, blocking))
+        queued = asyncio.create_task(scheduler.submit("queued", "b", 10, lambda: release.append("queued")))
+        await asyncio.sleep(0.05)
+        try:
+            await asyncio.wait_for(scheduler.drain(), 0.1)
+            timed_out = False
+        except asyncio.TimeoutError:
+            timed_out = True
+        gate.set()
+        await running
+        # Queued jobs are handed back to their callers instead of waiting forever
+        with pytest.raises(JobDeferred):
+            await queued
+        with pytest.raises(JobDeferred):
+            await scheduler.submit("late", "c", 10, lambda: release.append("late"))
+        return timed_out
+
+    assert asyncio.run(main())
+    # Draining stops queued jobs from starting
+    assert release == []
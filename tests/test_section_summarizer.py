@@ -0,0 +1,98 @@
+# Unit test for pipelined section summaries
+
+import asyncio
+
+from backend import summarizer
+from backend.summarizer import SectionSummarizer
+
+
+def test_sections_are_summarized_while_transcribing(monkeypatch):
+    calls = []
+
+    async def detailed(text, api_key=None, lang_code=None):
+        calls.append(("detailed", text, lang_code))
+        return f"notes on {text.splitlines()[0]}"
+
+    async def bullets(text, api_key=None, lang_code=None):
+        calls.append(("bullets", text, lang_code))
+        return "- point"
+
+    monkeypatch.setattr(summarizer, "generate_detailed_summary", detailed)
+    monkeypatch.setattr(summarizer, "generate_bullet_summary", bullets)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        sections = SectionSummarizer("key", loop, language=lambda: "fr", section_chars=20)
+        lines = ["premier segment", "deuxième segment", "troisième segment", "fin"]
+        # Fed from a worker thread, like whisper's output
+        await asyncio.to_thread(lambda: [sections.add(line) for line in lines])
+        await asyncio.sleep(0)
+        summarized_before_finish = len(calls)
+        result = await sections.finish("\n".join(lines), "fr")
+        return summarized_before_finish, result
+
+    summarized_before_finish, (bullet, detailed_summary) = asyncio.run(scenario())
+    assert summarized_before_finish >= 1
+    assert bullet == "- point"
+    # The merge pass works on the section notes, not on the full transcript
+    merge = [text for kind, text, _ in calls if kind == "bullets"][0]
+    assert merge.split("\n\n") == ["notes on premier segment", "notes on troisième segment"]
+    assert all(lang == "fr" for _, _, lang in calls)
+
+
+def test_short_transcripts_are_summarized_directly(monkeypatch):
+    async def fake(text, api_key=None, lang_code=None):
+        return text
+
+    monkeypatch.setattr(summarizer, "generate_detailed_summary", fake)
+    monkeypatch.setattr(summarizer, "generate_bullet_summary", fake)
+
+    async def scenario():
+        sections = SectionSummarizer("key", asyncio.get_running_loop(), section_chars=1000)
+        sections.add("court")
+        return await sections.finish("court")
+
+    assert asyncio.run(scenario()) == ("court", "court")
+
+
+def test_language_is_identified_once(monkeypatch):
+    identified = []
+
+    async def fake(text, api_key=None, lang_code=None):
+        return lang_code
+
+    def identify(text, hint=None):
+        identified.append(text)
+        return "de"
+
+    monkeypatch.setattr(summarizer, "generate_detailed_summary", fake)
+    monkeypatch.setattr(summarizer, "identify_language", identify)
+
+    async def scenario():
+        sections = SectionSummarizer("key", asyncio.get_running_loop(), section_chars=5)
+        for line in ["erster Abschnitt", "zweiter Abschnitt", "dritter Abschnitt"]:
+            sections.add(line)
+        return await asyncio.gather(*(asyncio.wrap_future(section) for section in sections._sections)), sections
+
+    notes, sections = asyncio.run(scenario())
+    assert notes == ["de", "de", "de"]
+    assert identified == ["erster Abschnitt"] and sections.lang_code == "de"
+
+
+def test_clients_are_bounded_and_closed(monkeypatch):
+    monkeypatch.setattr(summarizer, "_clients", summarizer.OrderedDict())
+    monkeypatch.setattr(summarizer, "MAX_LIMITERS", 2)
+
+    async def scenario():
+        async with summarizer.get_client("busy") as busy:
+            async with summarizer.get_client("old") as old:
+                pass
+            async with summarizer.get_client("new") as new:
+                pass
+            # The idle least recently used client is closed, the one in use is kept
+            assert old.is_closed() and not busy.is_closed() and not new.is_closed()
+        async with summarizer.get_client("new") as again:
+            assert again is new
+        return busy
+
+    assert not asyncio.run(scenario()).is_closed()
@@ -0,0 +1,73 @@
+# Unit test for the shared state backends
+
+import asyncio
+
+import pytest
+
+from backend.shared_state import LocalStateBackend, SQLiteStateBackend, StateBackend
+
+
+def test_events_reach_the_worker_holding_the_socket(tmp_path):
+    db_path = str(tmp_path / "state.db")
+
+    async def scenario():
+        received = {"a": [], "b": []}
+        workers = {}
+        for name, clients in (("a", ["client-1"]), ("b", ["client-2"])):
+            async def deliver(client_id, message, name=name):
+                received[name].append((client_id, message))
+            workers[name] = SQLiteStateBackend(db_path, poll_interval=0.01)
+            await workers[name].start(deliver, lambda clients=clients: clients)
+
+        # Published by worker a for a client connected to worker b
+        await workers["a"].publish("client-2", {"type": "progress", "value": 40})
+        await workers["b"].publish("client-1", {"type": "complete", "jobId": "job"})
+        await asyncio.sleep(0.2)
+        for worker in workers.values():
+            await worker.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received["a"] == [("client-1", {"type": "complete", "jobId": "job"})]
+    assert received["b"] == [("client-2", {"type": "progress", "value": 40})]
+
+
+def test_status_is_shared_between_workers(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    first, second = SQLiteStateBackend(db_path), SQLiteStateBackend(db_path)
+
+    async def scenario():
+        await first.set_status("client", {"jobId": "job", "duration": 42.0})
+        assert await second.get_status("client") == {"jobId": "job", "duration": 42.0}
+        await first.set_status("client", None)
+        assert await second.get_status("client") == {}
+
+    asyncio.run(scenario())
+
+
+def test_local_backend_delivers_directly():
+    async def scenario():
+        received = []
+
+        async def deliver(client_id, message):
+            received.append((client_id, message))
+
+        backend = LocalStateBackend()
+        await backend.start(deliver, lambda: [])
+        await backend.publish("client", {"type": "vad"})
+        return received
+
+    assert asyncio.run(scenario()) == [("client", {"type": "vad"})]
+
+
+def test_incomplete_backend_cannot_be_created():
+    class NoStatus(StateBackend):
+        async def start(self, deliver, local_clients):
+            pass
+
+        async def publish(self, client_id, message):
+            pass
+
+    # Fails when created, not on the first status lookup
+    with pytest.raises(TypeError):
+        NoStatus()
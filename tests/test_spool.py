@@ -0,0 +1,102 @@
+# Unit test for the temporary audio spool
+
+import io
+import os
+import time
+
+import pytest
+
+from backend import spool as spool_module
+from backend.spool import SpoolManager, SpoolFull, UploadTooLarge
+
+
+def _manager(tmp_path, **kwargs):
+    options = dict(
+        spool_dir=str(tmp_path / "disk"),
+        memory_dir=str(tmp_path / "memory"),
+        memory_threshold=100,
+        memory_quota=150,
+        job_quota=1000,
+        disk_quota=1500,
+    )
+    options.update(kwargs)
+    return SpoolManager(**options)
+
+
+def test_small_uploads_use_memory_tier(tmp_path):
+    manager = _manager(tmp_path)
+    small = manager.spool("small", io.BytesIO(b"x" * 80))
+    large = manager.spool("large", io.BytesIO(b"x" * 500))
+    assert os.path.dirname(small) == str(tmp_path / "memory")
+    assert os.path.dirname(large) == str(tmp_path / "disk")
+    # The memory quota is full, so the next small upload falls back to disk
+    other = manager.spool("other", io.BytesIO(b"x" * 80))
+    assert os.path.dirname(other) == str(tmp_path / "disk")
+    assert manager.usage() == {"memory": 80, "disk": 580}
+
+
+def test_quotas_are_enforced(tmp_path):
+    manager = _manager(tmp_path)
+    with pytest.raises(UploadTooLarge):
+        manager.spool("huge", io.BytesIO(b"x" * 1001))
+    manager.spool("a", io.BytesIO(b"x" * 900))
+    with pytest.raises(SpoolFull):
+        manager.spool("b", io.BytesIO(b"x" * 900))
+    # Failed admissions leave nothing behind
+    assert sorted(os.listdir(tmp_path / "disk")) == ["temp_a.wav"]
+
+
+def test_release_removes_derived_files(tmp_path):
+    manager = _manager(tmp_path)
+    path = manager.spool("job", io.BytesIO(b"x" * 500))
+    derived = manager.path_for("job", ".trimmed.wav")
+    open(derived, "wb").close()
+    open(path + ".txt", "wb").close()
+
+    manager.release("job")
+    assert os.listdir(tmp_path / "disk") == []
+    assert manager.usage() == {"memory": 0, "disk": 0}
+
+
+def test_derived_files_are_reserved_on_disk(tmp_path):
+    manager = _manager(tmp_path, job_quota=2000)
+    manager.spool("small", io.BytesIO(b"x" * 80))
+    derived = manager.reserve_derived("small", ".16k.wav", 1000)
+    assert os.path.dirname(derived) == str(tmp_path / "disk")
+    assert manager.usage() == {"memory": 80, "disk": 1000}
+    # Reserving the same file again replaces its reservation
+    manager.reserve_derived("small", ".16k.wav", 1200)
+    with pytest.raises(SpoolFull):
+        manager.reserve_derived("small", ".speech.wav", 400)
+
+    manager.release("small")
+    assert manager.usage() == {"memory": 0, "disk": 0}
+
+
+def test_derived_files_count_towards_the_job_quota(tmp_path):
+    manager = _manager(tmp_path)
+    manager.spool("job", io.BytesIO(b"x" * 500))
+    manager.reserve_derived("job", ".16k.wav", 300)
+    with pytest.raises(UploadTooLarge):
+        manager.reserve_derived("job", ".speech.wav", 300)
+    assert manager.usage()["disk"] == 800
+
+
+def test_janitor_sweeps_only_old_orphans(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool_module, "ORPHAN_AGE", 60)
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    manager = _manager(tmp_path, legacy_dirs=[str(legacy)])
+    live = manager.spool("live", io.BytesIO(b"x" * 500))
+    old = time.time() - 120
+    orphan = legacy / "temp_crashed.wav"
+    protected = legacy / "temp_pending.wav"
+    recent = legacy / "temp_recent.wav"
+    for path in (orphan, protected, recent):
+        path.write_bytes(b"x")
+    for path in (orphan, protected, live):
+        os.utime(path, (old, old))
+
+    removed = manager.sweep(protected=[str(protected)])
+    assert removed == [str(orphan)]
+    assert os.path.exists(live) and protected.exists() and recent.exists()
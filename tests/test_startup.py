@@ -0,0 +1,49 @@
+# Unit test for startup validation and warm-up
+
+import pytest
+
+from backend import startup
+from backend.startup import StartupReport, run_startup
+
+
+@pytest.fixture
+def whisper_paths(tmp_path, monkeypatch):
+    binary = tmp_path / "whisper-cli"
+    model = tmp_path / "model.bin"
+    monkeypatch.setenv("STUDYFLOW_WHISPER_BIN", str(binary))
+    monkeypatch.setenv("STUDYFLOW_WHISPER_MODEL", str(model))
+    startup.resolve_whisper_paths.cache_clear()
+    yield binary, model
+    startup.resolve_whisper_paths.cache_clear()
+
+
+@pytest.mark.parametrize("missing", ["binary", "model"])
+def test_missing_whisper_fails_fast(whisper_paths, monkeypatch, missing):
+    binary, model = whisper_paths
+    (model if missing == "binary" else binary).write_bytes(b"x")
+    warmed = []
+    monkeypatch.setattr(startup, "warm_up_whisper", lambda: warmed.append("whisper"))
+
+    report = run_startup(vad_enabled=True, report=StartupReport())
+    assert not report.ready
+    assert report.errors[0].startswith("validate_whisper: " + ("Binary" if missing == "binary" else "Model"))
+    # Nothing is warmed up for a replica that cannot transcribe
+    assert warmed == [] and "warm_vad" not in report.stages
+
+
+def test_whisper_paths_cache(whisper_paths, tmp_path, monkeypatch):
+    binary, model = whisper_paths
+    with pytest.raises(FileNotFoundError):
+        startup.resolve_whisper_paths()
+
+    # Failures are not cached: installing the files afterwards is picked up
+    binary.write_bytes(b"x")
+    model.write_bytes(b"x")
+    assert startup.resolve_whisper_paths() == (str(binary), str(model))
+
+    # Successes are cached until cache_clear(), even if the environment changes
+    monkeypatch.setenv("STUDYFLOW_WHISPER_MODEL", str(tmp_path / "other.bin"))
+    assert startup.resolve_whisper_paths() == (str(binary), str(model))
+    startup.resolve_whisper_paths.cache_clear()
+    with pytest.raises(FileNotFoundError):
+        startup.resolve_whisper_paths()
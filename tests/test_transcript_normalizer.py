@@ -0,0 +1,37 @@
+# Unit test for the transcript normalizer
+
+from backend.transcript_normalizer import TranscriptNormalizer, normalize_transcript
+
+WHISPER_OUTPUT = """
+[00:00:00.000 --> 00:00:04.200]   Bonjour à tous.
+[00:00:04.200 --> 00:00:06.000]   *music*
+[00:00:06.000 --> 00:00:09.500]   Aujourd'hui, *applause* la thermodynamique.
+[01:02:03.004 --> 01:02:05.000]  Fin du cours.
+"""
+
+
+class ShiftMap:
+    def to_original(self, t, is_end=False):
+        return t + 100.0
+
+
+def test_single_pass_outputs():
+    normalizer = TranscriptNormalizer()
+    for line in WHISPER_OUTPUT.splitlines(keepends=True):
+        normalizer.feed(line)
+
+    assert normalizer.plain_text == "Bonjour à tous.\nAujourd'hui, la thermodynamique.\nFin du cours."
+    assert normalizer.timestamped_text.splitlines()[0] == "[00:00:00.000 --> 00:00:04.200]   Bonjour à tous."
+    assert normalizer.segment_dicts()[-1] == {"start": 3723.004, "end": 3725.0, "text": "Fin du cours."}
+    assert len(normalizer.segments) == 3
+
+
+def test_offsets_are_applied_while_parsing():
+    normalizer = normalize_transcript(WHISPER_OUTPUT, offset_map=ShiftMap())
+    assert normalizer.segments[0].start == 100.0
+    assert normalizer.timestamped_text.startswith("[00:01:40.000 --> 00:01:44.200]")
+
+
+def test_untimed_text_is_kept():
+    assert normalize_transcript("Hello\n\n  world  ").plain_text == "Hello\nworld"
+    assert normalize_transcript("").plain_text == ""
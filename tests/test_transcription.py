@@ -1,5 +1,48 @@
 # Unit test for Transcription
 
+import os
+import threading
+import time
+
+import pytest
+
+from backend import audio_processor
+
+
 def test_transcription_accuracy():
     """Ensure the transcription output is accurate."""
-    pass
\ No newline at end of file
+    pass
+
+
+def test_terminated_transcription_is_interrupted(tmp_path, monkeypatch):
+    # Stand-in for whisper-cli that never finishes on its own
+    binary = tmp_path / "whisper-cli"
+    binary.write_text("#!/bin/sh\nexec sleep 30\n")
+    binary.chmod(0o755)
+    audio = tmp_path / "audio.wav"
+    audio.write_bytes(b"RIFF")
+    monkeypatch.setattr(audio_processor, "resolve_whisper_paths", lambda: (str(binary), "model.bin"))
+    monkeypatch.setattr(audio_processor, "_stopping", False)
+
+    errors = []
+
+    def transcribe():
+        try:
+            audio_processor.transcribe_audio(str(audio), audio_duration=10.0)
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=transcribe)
+    thread.start()
+    while not audio_processor._processes:
+        time.sleep(0.01)
+    started = time.monotonic()
+    assert audio_processor.terminate_transcriptions() == 1
+    thread.join(timeout=5)
+
+    assert time.monotonic() - started < 5
+    assert isinstance(errors[0], audio_processor.TranscriptionInterrupted)
+    assert not audio_processor._processes
+    # Nothing new starts once the shutdown stopped whisper
+    with pytest.raises(audio_processor.TranscriptionInterrupted):
+        audio_processor.transcribe_audio(str(audio), audio_duration=10.0)
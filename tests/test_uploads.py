@@ -0,0 +1,144 @@
+# Unit test for resumable chunked uploads
+
+import hashlib
+import os
+
+import pytest
+
+from backend.job_journal import JobJournal
+from backend.spool import SpoolManager
+from backend.uploads import (MIN_PART_SIZE, PartRejected, UploadAlreadyCompleted, UploadIncomplete, UploadManager,
+                             UploadNotFound)
+
+
+def _manager(tmp_path):
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    spool = SpoolManager(spool_dir=str(tmp_path / "disk"), memory_dir="", disk_quota=64 * MIN_PART_SIZE)
+    return UploadManager(journal, spool, part_size=MIN_PART_SIZE), journal, spool
+
+
+def _parts(data, part_size):
+    return [data[start:start + part_size] for start in range(0, len(data), part_size)]
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_parts_in_any_order_assemble_in_place(tmp_path):
+    manager, _, _ = _manager(tmp_path)
+    data = os.urandom(3 * MIN_PART_SIZE + 1234)
+    status = manager.initiate("client", "lecture.MP3", len(data))
+    assert status["parts"] == 4 and status["received"] == []
+
+    parts = _parts(data, status["partSize"])
+    for number in (3, 0, 2):
+        manager.write_part(status["uploadId"], number, parts[number], _sha(parts[number]))
+    assert manager.status(status["uploadId"])["received"] == [0, 2, 3]
+    with pytest.raises(UploadIncomplete):
+        manager.complete(status["uploadId"])
+
+    manager.write_part(status["uploadId"], 1, parts[1], _sha(parts[1]))
+    upload = manager.complete(status["uploadId"])
+    assert upload["path"].endswith(".mp3")
+    with open(upload["path"], "rb") as f:
+        assert f.read() == data
+    assert manager.open_uploads() == []
+
+
+def test_bad_parts_are_rejected(tmp_path):
+    manager, _, _ = _manager(tmp_path)
+    data = os.urandom(MIN_PART_SIZE + 10)
+    upload_id = manager.initiate("client", "a.wav", len(data))["uploadId"]
+    parts = _parts(data, MIN_PART_SIZE)
+
+    with pytest.raises(PartRejected):
+        manager.write_part(upload_id, 0, parts[0], _sha(b"other"))
+    with pytest.raises(PartRejected):
+        manager.write_part(upload_id, 1, parts[0], _sha(parts[0]))
+    with pytest.raises(PartRejected):
+        manager.write_part(upload_id, 2, parts[1], _sha(parts[1]))
+    with pytest.raises(UploadNotFound):
+        manager.status("missing")
+    assert manager.status(upload_id)["received"] == []
+
+
+def test_upload_resumes_after_restart(tmp_path):
+    manager, journal, _ = _manager(tmp_path)
+    data = os.urandom(2 * MIN_PART_SIZE)
+    upload_id = manager.initiate("client", "a.wav", len(data))["uploadId"]
+    parts = _parts(data, MIN_PART_SIZE)
+    manager.write_part(upload_id, 0, parts[0], _sha(parts[0]))
+
+    # A new process sees the acknowledged parts and keeps the partial file
+    restarted = UploadManager(JobJournal(journal.db_path),
+                              SpoolManager(spool_dir=str(tmp_path / "disk"), memory_dir=""),
+                              part_size=MIN_PART_SIZE)
+    restarted.recover()
+    assert restarted.status(upload_id)["received"] == [0]
+    restarted.write_part(upload_id, 1, parts[1], _sha(parts[1]))
+    with open(restarted.complete(upload_id)["path"], "rb") as f:
+        assert f.read() == data
+
+
+def test_upload_is_completed_once(tmp_path):
+    manager, _, _ = _manager(tmp_path)
+    data = os.urandom(100)
+    upload_id = manager.initiate("client", "a.wav", len(data))["uploadId"]
+    manager.write_part(upload_id, 0, data, _sha(data))
+    manager.complete(upload_id)
+    with pytest.raises(UploadAlreadyCompleted):
+        manager.complete(upload_id)
+
+
+def test_abandoned_uploads_expire(tmp_path):
+    manager, journal, spool = _manager(tmp_path)
+    stale = manager.initiate("client", "a.wav", 2 * MIN_PART_SIZE)["uploadId"]
+    fresh = manager.initiate("client", "b.wav", MIN_PART_SIZE)["uploadId"]
+    journal._connect().execute("UPDATE uploads SET updated_at = 0 WHERE upload_id = ?", (stale,))
+
+    assert manager.expire(ttl=60) == [stale]
+    with pytest.raises(UploadNotFound):
+        manager.status(stale)
+    # The preallocated file and its quota are freed, the active upload keeps its own
+    assert spool.usage()["disk"] == MIN_PART_SIZE
+    assert [upload["upload_id"] for upload in manager.open_uploads()] == [fresh]
+
+
+def test_upload_completed_by_another_worker(tmp_path):
+    # Two workers share the journal and the spool directory but not their reservations
+    first, journal, first_spool = _manager(tmp_path)
+    second_spool = SpoolManager(spool_dir=str(tmp_path / "disk"), memory_dir="", disk_quota=64 * MIN_PART_SIZE)
+    second = UploadManager(JobJournal(journal.db_path), second_spool, part_size=MIN_PART_SIZE)
+    data = os.urandom(100)
+    upload_id = first.initiate("client", "a.wav", len(data))["uploadId"]
+    second.write_part(upload_id, 0, data, _sha(data))
+
+    upload = second.complete(upload_id)
+    # The completing worker owns the file: its derived files can be reserved
+    second_spool.reserve_derived(upload_id, ".16k.wav", 1000)
+    # The initiating worker frees its reservation without touching the job's file
+    first.expire()
+    assert first_spool.usage()["disk"] == 0
+    assert os.path.exists(upload["path"])
+    second_spool.release(upload_id)
+    assert not os.path.exists(upload["path"]) and second_spool.usage()["disk"] == 0
+
+
+def test_journaled_job_replaces_the_upload(tmp_path):
+    manager, journal, _ = _manager(tmp_path)
+    data = os.urandom(100)
+    upload_id = manager.initiate("client", "a.wav", len(data))["uploadId"]
+    manager.write_part(upload_id, 0, data, _sha(data))
+    upload = manager.complete(upload_id)
+
+    # The job could not be journaled: the upload can be completed again
+    manager.reopen(upload_id)
+    assert manager.status(upload_id)["completed"] is False
+    manager.complete(upload_id)
+
+    journal.add(upload_id, "client", upload["path"], upload_id=upload_id)
+    assert journal.get(upload_id)["state"] == "queued"
+    with pytest.raises(UploadNotFound):
+        manager.status(upload_id)
+    assert journal._connect().execute("SELECT COUNT(*) FROM upload_parts").fetchone()[0] == 0
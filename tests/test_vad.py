@@ -0,0 +1,48 @@
+# Unit test for silence trimming
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import wave
+
+from backend.vad import FRAME_SECONDS, SAMPLE_RATE, OffsetMap, speech_regions, trim_silence
+
+
+def test_offset_map_restores_original_times():
+    offset_map = OffsetMap([(10.0, 20.0), (50.0, 55.0)])
+    assert offset_map.trimmed_duration == 15.0
+    assert offset_map.to_original(0.0) == 10.0
+    assert offset_map.to_original(12.5) == 52.5
+    assert offset_map.to_original(99.0) == 55.0
+    # On the cut, a start opens the next region while an end closes the previous one
+    assert offset_map.to_original(10.0) == 50.0
+    assert offset_map.to_original(10.0, is_end=True) == 20.0
+
+
+def test_long_silences_are_removed():
+    seconds = lambda s: int(s / FRAME_SECONDS)
+    energies = np.full(seconds(30), -80.0)
+    energies[seconds(2):seconds(5)] = -20.0
+    energies[seconds(5.5):seconds(8)] = -20.0  # short pause stays inside the region
+    energies[seconds(20):seconds(25)] = -20.0
+    regions = speech_regions(energies)
+    assert len(regions) == 2
+    assert regions[0][0] < 2.0 < 8.0 < regions[0][1] < 9.0
+    assert 19.0 < regions[1][0] < 20.0
+
+
+def test_already_decoded_audio_is_reused(tmp_path):
+    samples = np.zeros(SAMPLE_RATE * 30, dtype=np.int16)
+    samples[SAMPLE_RATE * 2:SAMPLE_RATE * 5] = (3000 * np.sin(np.arange(SAMPLE_RATE * 3) / 5)).astype(np.int16)
+    wav_path = tmp_path / "decoded.wav"
+    with wave.open(str(wav_path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes(samples.tobytes())
+
+    # The input is never decoded again, so it does not even have to exist
+    speech = trim_silence(str(tmp_path / "missing.mp3"), str(wav_path), str(tmp_path / "speech.wav"), decoded=True)
+    assert speech.original_duration == pytest.approx(30.0, abs=0.05)
+    assert 3.0 <= speech.speech_duration < 5.0